@@ -0,0 +1,45 @@
+"""
+Uygulama ayarları
+- Env değişkenleri ve .env dosyası açılışta bir kez okunur
+- Hot path'lerde os.getenv yerine `settings` attribute'ları kullanılır
+"""
+
+from pathlib import Path
+from typing import Literal, Optional
+
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Env'den okunan ayarlar (alan adları büyük/küçük harf duyarsız)"""
+
+    model_config = SettingsConfigDict(
+        env_file=Path(__file__).resolve().parent.parent / ".env",
+        extra="ignore",
+    )
+
+    github_token: Optional[str] = None
+    github_webhook_secret: str = ""
+    gemini_api_key: Optional[str] = None
+    # Boş bırakılırsa SDK varsayılanı: kalıcı gRPC kanalı (async için grpc_asyncio).
+    # gRPC'nin engellendiği ortamlarda "rest"
+    gemini_transport: Optional[str] = None
+    # Gemini'ye dakikada en fazla bu kadar istek (sync + async çağrılar ortak)
+    llm_requests_per_minute: int = 60
+    # Geçersiz değer import sırasında logging yerine burada, açık bir
+    # config hatasıyla reddedilir (küçük harf de kabul edilir)
+    log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO"
+    # Verilirse review sonuçları restart sonrası da diskte kalır (diskcache gerekir)
+    llm_cache_dir: Optional[str] = None
+    # Testler için: Gemini yerine sabit örnek cevaplar döner (network yok)
+    llm_mock: bool = False
+
+    @field_validator("log_level", mode="before")
+    @classmethod
+    def _upper_log_level(cls, value):
+        """LOG_LEVEL=debug gibi küçük harfli değerleri normalize et"""
+        return value.upper() if isinstance(value, str) else value
+
+
+settings = Settings()
@@ -1,9 +1,30 @@
-import requests
-from typing import Optional, Dict, Any
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import asyncio
+import time
+import httpx
+import orjson
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
+from typing import Optional, Dict, Any, List, Tuple
+from app.config import settings
+
+# Kalan istek sayısı bu eşiğin altına düşünce reset zamanına kadar beklenir
+RATE_LIMIT_THRESHOLD = 10
+# Reset bundan daha uzaktaysa beklemek yerine RateLimitError fırlatılır
+MAX_RATE_LIMIT_WAIT = 60
+# get_pr_diff varsayılan olarak en fazla bu kadar byte indirir
+MAX_DIFF_BYTES = 256 * 1024
+# ETag cache'inde tutulan diff'lerin toplam boyutu (karakter) bu sınırı aşmaz
+DIFF_CACHE_MAX_SIZE = 32 * 1024 * 1024
+
+
+class RateLimitError(Exception):
+    """GitHub API rate limit'i dolduğunda fırlatılır"""
+
+    def __init__(self, reset_at: float):
+        self.reset_at = reset_at
+        super().__init__(
+            f"GitHub rate limit aşıldı, {max(0, int(reset_at - time.time()))} sn sonra sıfırlanacak"
+        )
 
 
 class GitHubClient:
@@ -16,7 +37,7 @@ class GitHubClient:
         Args:
             token: GitHub Personal Access Token. Eğer None ise, GITHUB_TOKEN env'den alınır
         """
-        self.token = token or os.getenv("GITHUB_TOKEN")
+        self.token = token or settings.github_token
         if not self.token:
             raise ValueError(
                 "GITHUB_TOKEN env değişkeni veya token parametresi gereklidir"
@@ -28,8 +49,92 @@ class GitHubClient:
             "Accept": "application/vnd.github.v3+json",
             "Content-Type": "application/json",
         }
+        # Client default'larını ezen header'lar her istekte kopyalanmaz,
+        # bir kez hazırlanır (httpx bunları self.headers ile birleştirir)
+        self._headers_diff = {"Accept": "application/vnd.github.v3.diff"}
+
+        # HTTP/2 ile tüm istekler tek bir TLS bağlantısı üzerinden multiplex edilir
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # (url, max_bytes) -> (ETag, diff, was_cut). 304 Not Modified yanıtları rate limit'e
+        # sayılmaz. maxsize entry sayısı değil diff'lerin toplam uzunluğudur;
+        # sınır aşılınca en eski diff'ler atılır
+        self._diff_etags: TTLCache = TTLCache(
+            maxsize=DIFF_CACHE_MAX_SIZE,
+            ttl=3600,
+            getsizeof=lambda entry: len(entry[1]),
+        )
+
+        # X-RateLimit-* header'larından güncellenen kota bilgisi
+        self._remaining: Optional[int] = None
+        self._reset_at: float = 0.0
+        # Header'lardan bağımsız ikinci koruma: saatte 5000 istek
+        self._limiter = AsyncLimiter(5000, 3600)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Paylaşılan httpx client'ı döndür, yoksa oluştur"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                http2=True,
+                timeout=10,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Paylaşılan client'ı ve açık bağlantıları kapat"""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    async def _request(
+        self, method: str, url: str, stream: bool = False, **kwargs
+    ) -> httpx.Response:
+        """
+        Rate limit'e uyarak GitHub API'ye istek gönder
+
+        Kalan kota RATE_LIMIT_THRESHOLD altındaysa reset zamanına kadar bekler.
+        stream=True ise body okunmaz, response'u çağıran taraf kapatmalıdır.
 
-    def get_pr_diff(self, owner: str, repo: str, pr_number: int) -> str:
+        Raises:
+            RateLimitError: Kota dolmuşsa ve reset MAX_RATE_LIMIT_WAIT'ten uzaksa
+            httpx.HTTPError: İstek gönderilemezse
+        """
+        if self._remaining is not None and self._remaining < RATE_LIMIT_THRESHOLD:
+            wait = self._reset_at - time.time()
+            if wait > MAX_RATE_LIMIT_WAIT:
+                raise RateLimitError(self._reset_at)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._remaining = None
+
+        client = self._get_client()
+        async with self._limiter:
+            response = await client.send(
+                client.build_request(method, url, **kwargs), stream=stream
+            )
+
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset_at = response.headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset_at is not None:
+            self._remaining = int(remaining)
+            self._reset_at = float(reset_at)
+
+        if response.status_code in (403, 429) and self._remaining == 0:
+            await response.aclose()
+            raise RateLimitError(self._reset_at)
+
+        return response
+
+    async def get_pr_diff(
+        self,
+        owner: str,
+        repo: str,
+        pr_number: int,
+        max_bytes: Optional[int] = MAX_DIFF_BYTES,
+    ) -> str:
         """
         PR'dan diff string'i al
 
@@ -37,37 +142,118 @@ class GitHubClient:
             owner: Repository owner (GitHub kullanıcı adı)
             repo: Repository adı
             pr_number: Pull Request numarası
+            max_bytes: İndirilecek en fazla byte. Diff bu sınırda kesilir,
+                       tam diff için None verin
 
         Returns:
             Diff string'i
 
         Raises:
-            requests.RequestException: API çağrısı başarısız olursa
+            httpx.HTTPError: API çağrısı başarısız olursa
+            RateLimitError: GitHub rate limit'i dolmuşsa
             ValueError: Response parse edilemezse
         """
-        url = f"{self.base_url}/repos/{owner}/{repo}/pulls/{pr_number}"
+        diff_text, _ = await self.get_pr_diff_capped(
+            owner, repo, pr_number, max_bytes=max_bytes
+        )
+        return diff_text
 
-        # Diff'i almak için Accept header'ını değiştir
-        headers = self.headers.copy()
-        headers["Accept"] = "application/vnd.github.v3.diff"
+    async def get_pr_diff_capped(
+        self,
+        owner: str,
+        repo: str,
+        pr_number: int,
+        max_bytes: Optional[int] = MAX_DIFF_BYTES,
+    ) -> Tuple[str, bool]:
+        """
+        PR diff'ini en fazla max_bytes indirerek al, kesilip kesilmediğini de döndür
 
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+        Args ve Raises get_pr_diff ile aynı.
 
-            diff_text = response.text
+        Returns:
+            (diff, was_cut): was_cut True ise PR'nin diff'i max_bytes'tan uzundur
+            ve dönen diff sadece başıdır
+        """
+        url = f"/repos/{owner}/{repo}/pulls/{pr_number}"
 
-            if not diff_text:
-                raise ValueError("PR diff'i boş döndü")
+        # Diff'i almak için Accept header'ını değiştir (diğerleri client default'u)
+        headers = self._headers_diff
 
-            return diff_text
+        # Daha önce alınan diff varsa conditional request gönder
+        cache_key = (url, max_bytes)
+        cached: Optional[Tuple[str, str, bool]] = self._diff_etags.get(cache_key)
+        if cached:
+            headers = {**headers, "If-None-Match": cached[0]}
 
-        except requests.exceptions.RequestException as e:
-            raise requests.RequestException(
+        try:
+            response = await self._request("GET", url, stream=True, headers=headers)
+
+            try:
+                if cached and response.status_code == 304:
+                    return cached[1], cached[2]
+
+                response.raise_for_status()
+
+                # Diff'i parça parça oku; max_bytes'ı aşan ilk chunk'ta indirmeyi
+                # bırak (aşan byte diff'in gerçekten daha uzun olduğunu gösterir)
+                chunks = []
+                total = 0
+                was_cut = False
+                async for chunk in response.aiter_bytes(4096):
+                    chunks.append(chunk)
+                    total += len(chunk)
+                    if max_bytes is not None and total > max_bytes:
+                        was_cut = True
+                        break
+            finally:
+                await response.aclose()
+
+            data = b"".join(chunks)
+            if was_cut:
+                data = data[:max_bytes]
+            diff_text = data.decode("utf-8", errors="replace")
+
+        except httpx.HTTPError as e:
+            raise httpx.HTTPError(
                 f"PR diff alınamadı ({owner}/{repo}#{pr_number}): {str(e)}"
             )
 
-    def get_pr_files(self, owner: str, repo: str, pr_number: int) -> list:
+        if not diff_text:
+            raise ValueError("PR diff'i boş döndü")
+
+        # Cache'in tamamından büyük diff (max_bytes=None) saklanmaz
+        etag = response.headers.get("ETag")
+        if etag and len(diff_text) <= DIFF_CACHE_MAX_SIZE:
+            self._diff_etags[cache_key] = (etag, diff_text, was_cut)
+
+        return diff_text, was_cut
+
+    async def get_pr(self, owner: str, repo: str, pr_number: int) -> Dict[str, Any]:
+        """
+        PR detaylarını al (head commit SHA'sı inline comment için gerekli)
+
+        Args:
+            owner: Repository owner
+            repo: Repository adı
+            pr_number: Pull Request numarası
+
+        Returns:
+            PR bilgileri (head.sha, title, state vb.)
+        """
+        url = f"/repos/{owner}/{repo}/pulls/{pr_number}"
+
+        try:
+            response = await self._request("GET", url)
+            response.raise_for_status()
+
+            return orjson.loads(response.content)
+
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            raise httpx.HTTPError(
+                f"PR bilgisi alınamadı ({owner}/{repo}#{pr_number}): {str(e)}"
+            )
+
+    async def get_pr_files(self, owner: str, repo: str, pr_number: int) -> list:
         """
         PR'daki değişen dosyaları al
 
@@ -79,20 +265,21 @@ class GitHubClient:
         Returns:
             Dosya listesi (her dosya: filename, status, additions, deletions vb.)
         """
-        url = f"{self.base_url}/repos/{owner}/{repo}/pulls/{pr_number}/files"
+        url = f"/repos/{owner}/{repo}/pulls/{pr_number}/files"
 
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = await self._request("GET", url)
             response.raise_for_status()
 
-            return response.json()
+            # orjson bytes'ı doğrudan parse eder, ayrı bir decode adımı gerekmez
+            return orjson.loads(response.content)
 
-        except requests.exceptions.RequestException as e:
-            raise requests.RequestException(
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            raise httpx.HTTPError(
                 f"PR dosyaları alınamadı ({owner}/{repo}#{pr_number}): {str(e)}"
             )
 
-    def post_pr_comment(
+    async def post_pr_comment(
         self, owner: str, repo: str, pr_number: int, body: str
     ) -> Dict[str, Any]:
         """
@@ -108,26 +295,25 @@ class GitHubClient:
             GitHub API response (comment details)
 
         Raises:
-            requests.RequestException: API çağrısı başarısız olursa
+            httpx.HTTPError: API çağrısı başarısız olursa
         """
-        url = f"{self.base_url}/repos/{owner}/{repo}/issues/{pr_number}/comments"
+        url = f"/repos/{owner}/{repo}/issues/{pr_number}/comments"
 
         payload = {"body": body}
 
         try:
-            response = requests.post(
-                url, headers=self.headers, json=payload, timeout=10
-            )
+            # Content-Type: application/json client default header'larında var
+            response = await self._request("POST", url, content=orjson.dumps(payload))
             response.raise_for_status()
 
-            return response.json()
+            return orjson.loads(response.content)
 
-        except requests.exceptions.RequestException as e:
-            raise requests.RequestException(
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            raise httpx.HTTPError(
                 f"PR yorumu gönderilemedii ({owner}/{repo}#{pr_number}): {str(e)}"
             )
 
-    def post_pr_review_comment(
+    async def post_pr_review_comment(
         self,
         owner: str,
         repo: str,
@@ -152,25 +338,112 @@ class GitHubClient:
         Returns:
             GitHub API response
         """
-        url = f"{self.base_url}/repos/{owner}/{repo}/pulls/{pr_number}/comments"
+        url = f"/repos/{owner}/{repo}/pulls/{pr_number}/comments"
 
         payload = {"commit_id": commit_id, "path": path, "line": line, "body": body}
 
         try:
-            response = requests.post(
-                url, headers=self.headers, json=payload, timeout=10
-            )
+            # Content-Type: application/json client default header'larında var
+            response = await self._request("POST", url, content=orjson.dumps(payload))
             response.raise_for_status()
 
-            return response.json()
+            return orjson.loads(response.content)
 
-        except requests.exceptions.RequestException as e:
-            raise requests.RequestException(f"Review comment gönderilemedii: {str(e)}")
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            raise httpx.HTTPError(f"Review comment gönderilemedii: {str(e)}")
+
+    async def post_pr_review_comments(
+        self,
+        owner: str,
+        repo: str,
+        pr_number: int,
+        commit_id: str,
+        comments: List[Dict[str, Any]],
+        max_concurrency: int = 5,
+    ) -> List[Any]:
+        """
+        Birden fazla inline review comment'i paralel gönder
+
+        Args:
+            owner: Repository owner
+            repo: Repository adı
+            pr_number: Pull Request numarası
+            commit_id: Commit SHA
+            comments: Her biri path, line ve body içeren comment listesi
+            max_concurrency: Aynı anda açık en fazla istek sayısı
+                (GitHub secondary rate limit'ine takılmamak için)
+
+        Returns:
+            Her comment için GitHub API response'u ya da oluşan exception.
+            Bir comment'in başarısız olması diğerlerini durdurmaz.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _post(comment: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.post_pr_review_comment(
+                    owner=owner,
+                    repo=repo,
+                    pr_number=pr_number,
+                    commit_id=commit_id,
+                    path=comment["path"],
+                    line=comment["line"],
+                    body=comment["body"],
+                )
+
+        tasks = [_post(comment) for comment in comments]
+
+        return await asyncio.gather(*tasks, return_exceptions=True)
 
 
 # ============= Test Fonksiyonları =============
 
 
+# Menü boyunca tek event loop ve tek client: testler arasında httpx'in
+# keep-alive bağlantısı (TCP + TLS) yeniden kullanılır
+_test_loop: Optional[asyncio.AbstractEventLoop] = None
+_test_client: Optional[GitHubClient] = None
+
+
+# Test comment
+_TEST_COMMENT = """## 🤖 PR Code Reviewer - Test Comment
+
+Bu bir tests yorumudur. Eğer bu mesajı görüyorsanız, GitHub API entegrasyonu çalışıyor!
+
+**Test detayları:**
+- ✅ Token geçerli
+- ✅ API çağrısı başarılı
+- ✅ Comment postu çalışıyor
+
+---
+*Otomatik olarak oluşturuldu*
+"""
+
+
+def _get_test_client() -> GitHubClient:
+    """Menüdeki testlerin paylaştığı client (ilk kullanımda oluşturulur)"""
+    global _test_client
+    if _test_client is None:
+        _test_client = GitHubClient()
+    return _test_client
+
+
+def _run(coro):
+    """Coroutine'i menünün kalıcı event loop'unda çalıştır"""
+    global _test_loop
+    if _test_loop is None:
+        _test_loop = asyncio.new_event_loop()
+    return _test_loop.run_until_complete(coro)
+
+
+def _close_test_client() -> None:
+    """Paylaşılan client'ı ve event loop'u kapat"""
+    if _test_client is not None:
+        _run(_test_client.aclose())
+    if _test_loop is not None:
+        _test_loop.close()
+
+
 def test_get_pr_diff():
     """get_pr_diff tests et"""
     print("=" * 60)
@@ -183,8 +456,8 @@ def test_get_pr_diff():
     pr_number = int(input("PR numarası girin (örn: 1): "))
 
     try:
-        client = GitHubClient()
-        diff = client.get_pr_diff(owner, repo, pr_number)
+        client = _get_test_client()
+        diff = _run(client.get_pr_diff(owner, repo, pr_number))
 
         print(f"\n✅ Başarılı! Diff uzunluğu: {len(diff)} karakter")
         print("\nDiff preview (ilk 500 karakter):")
@@ -209,23 +482,11 @@ def test_post_pr_comment():
     repo = input("Repository adı girin: ").strip()
     pr_number = int(input("PR numarası girin: "))
 
-    # Test comment
-    test_body = """## 🤖 PR Code Reviewer - Test Comment
-
-Bu bir tests yorumudur. Eğer bu mesajı görüyorsanız, GitHub API entegrasyonu çalışıyor!
-
-**Test detayları:**
-- ✅ Token geçerli
-- ✅ API çağrısı başarılı
-- ✅ Comment postu çalışıyor
-
----
-*Otomatik olarak oluşturuldu*
-"""
-
     try:
-        client = GitHubClient()
-        response = client.post_pr_comment(owner, repo, pr_number, test_body)
+        client = _get_test_client()
+        response = _run(
+            client.post_pr_comment(owner, repo, pr_number, _TEST_COMMENT)
+        )
 
         print(f"\n✅ Başarılı! Comment ID: {response.get('id')}")
         print(f"Comment URL: {response.get('html_url')}")
@@ -248,8 +509,8 @@ def test_get_pr_files():
     pr_number = int(input("PR numarası girin: "))
 
     try:
-        client = GitHubClient()
-        files = client.get_pr_files(owner, repo, pr_number)
+        client = _get_test_client()
+        files = _run(client.get_pr_files(owner, repo, pr_number))
 
         print(f"\n✅ Başarılı! {len(files)} dosya bulundu\n")
 
@@ -266,6 +527,51 @@ def test_get_pr_files():
         return None
 
 
+def test_all():
+    """
+    Üç çağrıyı aynı PR için aynı anda tests et
+
+    Çağrılar birbirinden bağımsız olduğu için asyncio.gather ile paralel
+    gönderilir; toplam süre en yavaş çağrı kadar olur.
+    """
+    print("\n" + "=" * 60)
+    print("TEST: get_pr_diff + get_pr_files + post_pr_comment (paralel)")
+    print("=" * 60)
+
+    owner = input("Repository owner girin: ").strip()
+    repo = input("Repository adı girin: ").strip()
+    pr_number = int(input("PR numarası girin: "))
+
+    try:
+        client = _get_test_client()
+    except Exception as e:
+        print(f"❌ Hata: {str(e)}")
+        return None
+
+    async def _all():
+        return await asyncio.gather(
+            client.get_pr_diff(owner, repo, pr_number),
+            client.get_pr_files(owner, repo, pr_number),
+            client.post_pr_comment(owner, repo, pr_number, _TEST_COMMENT),
+            return_exceptions=True,
+        )
+
+    results = _run(_all())
+    names = ("get_pr_diff", "get_pr_files", "post_pr_comment")
+
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            print(f"❌ {name}: {str(result)}")
+        elif name == "get_pr_diff":
+            print(f"✅ {name}: {len(result)} karakter")
+        elif name == "get_pr_files":
+            print(f"✅ {name}: {len(result)} dosya")
+        else:
+            print(f"✅ {name}: {result.get('html_url')}")
+
+    return results
+
+
 if __name__ == "__main__":
     print("🚀 GitHub Client Test Suite\n")
 
@@ -274,26 +580,31 @@ Seçim yapın:
 1. get_pr_diff tests et
 2. post_pr_comment tests et
 3. get_pr_files tests et
-4. Tümünü sırasıyla tests et
+4. Tümünü aynı anda tests et
 0. Çık
 
 Seçiminiz: """
 
-    while True:
-        choice = input(menu).strip()
-
-        if choice == "1":
-            test_get_pr_diff()
-        elif choice == "2":
-            test_post_pr_comment()
-        elif choice == "3":
-            test_get_pr_files()
-        elif choice == "4":
-            test_get_pr_diff()
-            test_get_pr_files()
-            test_post_pr_comment()
-        elif choice == "0":
-            print("\nÇıkılıyor...")
-            break
-        else:
-            print("❌ Geçersiz seçim")
+    # Menü seçimi -> test fonksiyonu
+    actions = {
+        "1": test_get_pr_diff,
+        "2": test_post_pr_comment,
+        "3": test_get_pr_files,
+        "4": test_all,
+    }
+
+    try:
+        while True:
+            choice = input(menu).strip()
+
+            if choice == "0":
+                print("\nÇıkılıyor...")
+                break
+
+            action = actions.get(choice)
+            if action is None:
+                print("❌ Geçersiz seçim")
+            else:
+                action()
+    finally:
+        _close_test_client()
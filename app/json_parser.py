@@ -5,13 +5,50 @@ Robust JSON Parser with Fallback Strategies
 - Few-shot parsing
 """
 
+import copy
 import json
+import orjson
 import re
 from typing import Optional, Dict, Any
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Precompiled patterns (compiled once at import instead of per call)
+# {key: / ,key:  ->  {"key": / ,"key":
+_UNQUOTED_KEY = re.compile(r"([{,])\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:")
+# , ] / , }  ->  ] / }
+_TRAILING_COMMA = re.compile(r",\s*([\]}])")
+# ```json ... ```, ~~~json ... ~~~ or plain fenced block contents (group 2)
+_FENCE = re.compile(r"(```|~~~)(?:json|JSON)?\s*(.*?)\1", re.DOTALL)
+
+# Set on every Strategy 5 result so callers can tell a parse failure from a
+# real (possibly empty) answer, e.g. to keep it out of result caches
+FALLBACK_KEY = "parse_failed"
+
+# Empty results per expected structure (Strategy 5), built once at import
+_FALLBACK_RESPONSES = {
+    "short_summary": {
+        "summary": "Unable to analyze - parsing error",
+        "severity": "unknown",
+        "type": "unknown",
+    },
+    "bug_detection": {
+        "issues": [],
+        "has_bugs": False,
+        "overall_risk": "unknown",
+    },
+    "performance": {"suggestions": [], "optimization_potential": "unknown"},
+    "security": {
+        "vulnerabilities": [],
+        "has_security_issues": False,
+        "security_level": "unknown",
+    },
+    "file_review": {"files": []},
+    "batch_summary": {"summaries": []},
+    "generic": {"error": "Parsing failed", "status": "degraded"},
+}
+
 
 class JSONParser:
     """Robust JSON parser with multiple fallback strategies"""
@@ -31,77 +68,83 @@ class JSONParser:
             Parsed JSON or None if all strategies fail
         """
 
-        # Strategy 1: Direct JSON parsing
-        result = JSONParser._strategy_direct_parse(response_text)
-        if result:
-            logger.debug("✅ Strategy 1 (Direct Parse) succeeded")
-            return result
+        # Strategies 1-4: start with the one matching the response shape,
+        # then fall back to the rest in the usual order
+        first = JSONParser._classify(response_text)
 
-        # Strategy 2: Extract JSON from markdown code blocks
-        result = JSONParser._strategy_extract_from_markdown(response_text)
-        if result:
-            logger.debug("✅ Strategy 2 (Markdown Extract) succeeded")
-            return result
-
-        # Strategy 3: Fix common JSON syntax errors
-        result = JSONParser._strategy_fix_common_errors(response_text)
-        if result:
-            logger.debug("✅ Strategy 3 (Fix Common Errors) succeeded")
-            return result
-
-        # Strategy 4: Regex-based extraction
-        result = JSONParser._strategy_regex_extraction(response_text)
-        if result:
-            logger.debug("✅ Strategy 4 (Regex Extraction) succeeded")
-            return result
+        for name in _STRATEGY_ORDER[first]:
+            label, strategy = _STRATEGIES[name]
+            result = strategy(response_text)
+            if result:
+                logger.debug("✅ %s succeeded", label)
+                return result
 
         # Strategy 5: Fallback empty response (graceful degradation)
         result = JSONParser._strategy_fallback_template(expected_structure)
         if result:
             logger.warning(
-                f"⚠️  Strategy 5 (Fallback Template) used for: {expected_structure}"
+                "⚠️  Strategy 5 (Fallback Template) used for: %s", expected_structure
             )
             return result
 
-        logger.error(f"❌ All strategies failed for response: {response_text[:100]}...")
+        logger.error("❌ All strategies failed for response: %s...", response_text[:100])
         return None
 
+    @staticmethod
+    def _classify(text: str) -> str:
+        """
+        Guess which strategy will succeed using cheap string checks (no regex)
+
+        LLM responses are rarely bare JSON, so trying a direct parse first usually
+        wastes a full failed parse before the real one.
+        """
+        head = text.lstrip()[:16]
+        if head.startswith("{"):
+            # {'key': ...} never parses directly; go straight to the quote fix
+            if "'" in head and '"' not in head:
+                return "fix_common_errors"
+            return "direct"
+        if "```" in text or "~~~" in text:
+            return "markdown"
+        return "fix_common_errors"
+
     @staticmethod
     def _strategy_direct_parse(text: str) -> Optional[Dict[str, Any]]:
         """Try direct JSON parsing"""
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+
+        # Stdlib json is slower but accepts what orjson rejects
+        # (NaN/Infinity, integers wider than 64 bits)
         try:
             return json.loads(text)
-        except json.JSONDecodeError:
+        except ValueError:
             return None
 
     @staticmethod
     def _strategy_extract_from_markdown(text: str) -> Optional[Dict[str, Any]]:
-        """Extract JSON from ```json ... ``` blocks"""
-        try:
-            # Try ```json blocks
-            if "```json" in text:
-                start = text.find("```json") + 7
-                end = text.find("```", start)
-                if end > start:
-                    json_str = text[start:end].strip()
-                    return json.loads(json_str)
-
-            # Try plain ``` blocks
-            if "```" in text:
-                start = text.find("```") + 3
-                end = text.find("```", start)
-                if end > start:
-                    json_str = text[start:end].strip()
-                    return json.loads(json_str)
-
-        except (json.JSONDecodeError, ValueError):
-            pass
+        """Extract JSON from ```json / ~~~json or plain fenced blocks"""
+        # One pass over the text; the first fenced block that parses wins
+        for match in _FENCE.finditer(text):
+            try:
+                return orjson.loads(match.group(2).strip())
+            except (orjson.JSONDecodeError, ValueError):
+                continue
 
         return None
 
     @staticmethod
     def _strategy_fix_common_errors(text: str) -> Optional[Dict[str, Any]]:
         """Fix common JSON formatting errors"""
+        # Probe before repair: if only surrounding whitespace was wrong,
+        # skip the prefix stripping and regex passes entirely
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+
         try:
             # Remove leading/trailing whitespace and non-JSON characters
             text = text.strip()
@@ -111,12 +154,12 @@ class JSONParser:
                 text = text[1:]
 
             # Remove common prefixes
-            for prefix in ["```json", "```", "json", "JSON"]:
+            for prefix in ["```json", "```", "~~~json", "~~~", "json", "JSON"]:
                 if text.startswith(prefix):
                     text = text[len(prefix) :].strip()
 
             # Remove common suffixes
-            text = text.rstrip("`")
+            text = text.rstrip("`~")
 
             # Fix single quotes to double quotes (dangerous but sometimes necessary)
             # Only if no double quotes exist
@@ -124,30 +167,64 @@ class JSONParser:
                 text = text.replace("'", '"')
 
             # Fix unquoted keys: {key: -> {"key":
-            text = re.sub(r"{\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:", r'{"\1":', text)
-            text = re.sub(r",\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:", r',"\1":', text)
+            text = _UNQUOTED_KEY.sub(r'\1"\2":', text)
 
             # Fix trailing commas: , ] -> ]
-            text = re.sub(r",\s*]", "]", text)
-            text = re.sub(r",\s*}", "}", text)
+            text = _TRAILING_COMMA.sub(r"\1", text)
 
             # Try to parse fixed JSON
-            return json.loads(text)
+            return orjson.loads(text)
 
-        except (json.JSONDecodeError, ValueError):
+        except (orjson.JSONDecodeError, ValueError):
             return None
 
+    @staticmethod
+    def _find_json_object(text: str) -> Optional[str]:
+        """
+        Return the first balanced { ... } object in text
+
+        Single O(N) pass tracking brace depth; braces inside string
+        literals are ignored. Handles arbitrary nesting and, unlike a
+        backtracking regex, cannot blow up on pathological input.
+        """
+        start = text.find("{")
+        if start == -1:
+            return None
+
+        depth = 0
+        in_string = False
+        escape = False
+
+        for i in range(start, len(text)):
+            ch = text[i]
+
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return text[start : i + 1]
+
+        return None
+
     @staticmethod
     def _strategy_regex_extraction(text: str) -> Optional[Dict[str, Any]]:
-        """Extract JSON using regex patterns"""
+        """Extract the first balanced JSON object embedded in text"""
         try:
-            # Find JSON-like object: { ... }
-            match = re.search(r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}", text, re.DOTALL)
-            if match:
-                json_str = match.group(0)
-                return json.loads(json_str)
+            json_str = JSONParser._find_json_object(text)
+            if json_str:
+                return orjson.loads(json_str)
 
-        except (json.JSONDecodeError, ValueError):
+        except (orjson.JSONDecodeError, ValueError):
             pass
 
         return None
@@ -158,27 +235,34 @@ class JSONParser:
     ) -> Optional[Dict[str, Any]]:
         """Return fallback empty response based on expected structure"""
 
-        fallback_responses = {
-            "short_summary": {
-                "summary": "Unable to analyze - parsing error",
-                "severity": "unknown",
-                "type": "unknown",
-            },
-            "bug_detection": {
-                "issues": [],
-                "has_bugs": False,
-                "overall_risk": "unknown",
-            },
-            "performance": {"suggestions": [], "optimization_potential": "unknown"},
-            "security": {
-                "vulnerabilities": [],
-                "has_security_issues": False,
-                "security_level": "unknown",
-            },
-            "generic": {"error": "Parsing failed", "status": "degraded"},
-        }
-
-        return fallback_responses.get(expected_structure, fallback_responses["generic"])
+        # Copy: callers add to these results, the templates must stay empty
+        template = _FALLBACK_RESPONSES.get(
+            expected_structure, _FALLBACK_RESPONSES["generic"]
+        )
+        result = copy.deepcopy(template)
+        result[FALLBACK_KEY] = True
+        return result
+
+
+# Strategy table, built once: name -> (log label, function)
+_STRATEGIES = {
+    "direct": ("Strategy 1 (Direct Parse)", JSONParser._strategy_direct_parse),
+    "markdown": (
+        "Strategy 2 (Markdown Extract)",
+        JSONParser._strategy_extract_from_markdown,
+    ),
+    "fix_common_errors": (
+        "Strategy 3 (Fix Common Errors)",
+        JSONParser._strategy_fix_common_errors,
+    ),
+    "regex": ("Strategy 4 (Regex Extraction)", JSONParser._strategy_regex_extraction),
+}
+
+# _classify result -> full try order (that strategy first, then the usual order)
+_STRATEGY_ORDER = {
+    first: [first] + [name for name in _STRATEGIES if name != first]
+    for first in _STRATEGIES
+}
 
 
 # ============= Test Fonksiyonları =============
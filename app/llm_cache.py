@@ -0,0 +1,145 @@
+"""
+Review result cache
+- Content-addressed: xxh3-128 (or blake2b) of diff + review types + cache version
+- In-memory LRU, optionally backed by an on-disk cache (diskcache)
+- Hit/miss counters for /metrics
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+import orjson
+
+try:
+    import xxhash
+except ImportError:  # Optional: blake2b is used for keys without it
+    xxhash = None
+
+try:
+    import diskcache
+except ImportError:  # Only needed when a cache directory is configured
+    diskcache = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when prompts or the result shape change so stale entries are never served
+CACHE_VERSION = "v2"
+
+
+class LLMCache:
+    """Two-level cache for LLM review results (memory LRU + optional disk)"""
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        directory: Optional[str] = None,
+        expire: int = 86400,
+    ):
+        """
+        Args:
+            maxsize: Max entries kept in memory (least recently used evicted)
+            directory: diskcache directory; None keeps the cache in memory only
+            expire: Seconds a disk entry stays valid
+        """
+        self.maxsize = maxsize
+        self.expire = expire
+
+        # key -> orjson-serialized result, in LRU order
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._disk = None
+        if directory:
+            # A configured directory that silently stays in memory would look
+            # like a working persistent cache, so refuse to start instead
+            if diskcache is None:
+                raise RuntimeError(
+                    "LLM_CACHE_DIR is set but diskcache is not installed"
+                )
+            self._disk = diskcache.Cache(directory)
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        diff_text: str, review_types: Iterable[str], max_length: Optional[int] = None
+    ) -> str:
+        """
+        Exact-match key for a diff, the requested review types and the
+        truncation limit the review ran with
+
+        Keys only need to be collision-resistant, not cryptographic: xxh3
+        hashes a large diff several times faster than sha256. Both
+        variants give 128-bit keys.
+        """
+        types = ",".join(sorted(review_types))
+        key = f"{diff_text}|{types}|{max_length}|{CACHE_VERSION}".encode()
+
+        if xxhash is not None:
+            return xxhash.xxh3_128_hexdigest(key)
+        return hashlib.blake2b(key, digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of the cached result, or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+
+        if data is None and self._disk is not None:
+            data = self._disk.get(key)
+            if data is not None:
+                self._remember(key, data)
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return orjson.loads(data)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a result in memory and, if configured, on disk"""
+        data = orjson.dumps(value)
+        self._remember(key, data)
+
+        if self._disk is not None:
+            self._disk.set(key, data, expire=self.expire)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._memory.clear()
+            self.hits = 0
+            self.misses = 0
+
+        if self._disk is not None:
+            self._disk.clear()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._memory)
+
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups * 100, 1) if lookups else 0.0,
+            "memory_entries": size,
+            "disk": self._disk is not None,
+        }
+
+    def _remember(self, key: str, data: bytes) -> None:
+        """Insert into the memory LRU, evicting the oldest entry when full"""
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            if len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
@@ -1,56 +1,175 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from typing import List, Optional
-from app.reviewer import review_diff, truncate_diff, ParseStatistics
-from app.github_client import GitHubClient
-import json
+from typing import Any, Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+from app.reviewer import (
+    load_tokenizer,
+    review_cache_stats,
+    review_diff_async,
+    review_files,
+    ParseStatistics,
+    TokenManager,
+)
+from app.config import settings
+from app.github_client import GitHubClient, RateLimitError
+from cachetools import TTLCache
+import asyncio
+import orjson
+import msgspec
 import hmac
 import hashlib
-import os
-from dotenv import load_dotenv
+import time
 import logging
 
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (production'da LOG_LEVEL=WARNING ile info log'ları formatlanmaz bile)
+logging.basicConfig(level=settings.log_level)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="PR Code Reviewer", version="0.2.0")
+_VALID_TYPES: frozenset = frozenset(
+    ("short_summary", "bug_detection", "performance", "security")
+)
+_DEFAULT_REVIEW_TYPES = ("short_summary", "bug_detection")
+# Review tetikleyen pull_request action'ları
+_TRIGGER_ACTIONS: frozenset = frozenset(("opened", "synchronize"))
+
+# Aynı head SHA için tekrar gelen webhook'larda (GitHub retry, duplicate delivery)
+# diff'i yeniden çekmeden ve LLM'e gitmeden önceki sonucu döndür
+_review_cache: TTLCache = TTLCache(maxsize=512, ttl=3600)
+# Devam eden review'lar: aynı head SHA için eş zamanlı gelen webhook'lar
+# ikinci bir review başlatmak yerine aynı task'ın sonucunu bekler
+_reviews_in_flight: Dict[Tuple[str, str, str], "asyncio.Task"] = {}
+
+# Son 10 dakikada işlenen X-GitHub-Delivery id'leri (5xx sonrası GitHub retry'ları)
+_seen_deliveries: TTLCache = TTLCache(maxsize=4096, ttl=600)
+
+# Webhook secret'ı bir kez okunur; key setup'ı yapılmış HMAC her istekte .copy() ile kullanılır
+_WEBHOOK_SECRET: bytes = settings.github_webhook_secret.encode()
+_HMAC_TEMPLATE = (
+    hmac.new(_WEBHOOK_SECRET, digestmod=hashlib.sha256) if _WEBHOOK_SECRET else None
+)
+# Lifespan'de tokenizer yüklemesi için beklenecek en uzun süre (saniye)
+_TOKENIZER_LOAD_TIMEOUT = 10
+
+# "sha256=" + 64 hex karakter
+_SIGNATURE_LENGTH = 7 + 2 * hashlib.sha256().digest_size
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Açılışta tek bir GitHubClient oluştur, kapanışta bağlantı havuzunu kapat
+
+    Tüm istekler aynı client'ı (ve keep-alive HTTP/2 bağlantılarını) paylaşır.
+    GITHUB_TOKEN yoksa uygulama yine açılır; /local-review çalışmaya devam eder.
+    """
+    # Tokenizer ilk yüklemede encoding dosyasını indirir (timeout'suz, blocking);
+    # event loop'u bloklamaması için worker thread'de yüklenir. Süre aşılırsa
+    # yükleme arka planda sürer, o zamana kadar token sayısı tahmin edilir.
+    try:
+        await asyncio.wait_for(
+            asyncio.to_thread(load_tokenizer), timeout=_TOKENIZER_LOAD_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        logger.warning("⚠️  Tokenizer yüklenemedi, token sayısı tahmin edilecek")
+
+    try:
+        app.state.github_client = GitHubClient()
+        app.state.github_client_error = None
+    except ValueError as e:
+        logger.warning("⚠️  GitHub client oluşturulamadı: %s", e)
+        app.state.github_client = None
+        app.state.github_client_error = str(e)
+
+    yield
+
+    if app.state.github_client is not None:
+        await app.state.github_client.aclose()
+
+
+def get_github_client(request: Request) -> GitHubClient:
+    """Lifespan'de oluşturulan paylaşılan GitHubClient'ı döndür (Depends)"""
+    github_client = request.app.state.github_client
+    if github_client is None:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Review hatası: {request.app.state.github_client_error}",
+        )
+    return github_client
+
+
+class ORJSONResponse(JSONResponse):
+    """Response body'sini stdlib json yerine orjson ile serialize eder"""
 
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
 
-def verify_github_signature(payload_body: bytes, signature_header: str) -> bool:
+
+app = FastAPI(
+    title="PR Code Reviewer",
+    version="0.2.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# 1 KB üzeri JSON response'lar (analyses, issue listeleri) gzip ile sıkıştırılır
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+def _signature_matches(mac: Optional["hmac.HMAC"], signature_header: str) -> bool:
     """
-    GitHub webhook signature'ını doğrula (HMAC SHA-256)
+    Body ile beslenmiş HMAC'i header'daki signature ile karşılaştır
 
     Args:
-        payload_body: Ham request body (bytes)
+        mac: Tüm body ile update edilmiş HMAC (secret tanımlı değilse None)
         signature_header: X-Hub-Signature-256 header değeri
-
-    Returns:
-        True: Signature geçerli, False: Geçersiz
     """
     if not signature_header:
         return False
 
-    # GitHub webhook secret'ı al
-    webhook_secret = os.getenv("GITHUB_WEBHOOK_SECRET")
-    if not webhook_secret:
+    if mac is None:
         logger.warning("⚠️  GITHUB_WEBHOOK_SECRET tanımlanmamış")
         return True
 
-    # Signature formatı: sha256=<hash>
-    if not signature_header.startswith("sha256="):
+    expected_signature = _parse_signature(signature_header)
+    if expected_signature is None:
         return False
 
-    expected_signature = signature_header.split("=")[1]
+    # Timing attack'a karşı secure comparison
+    # (hashlib SHA-256'yı OpenSSL üzerinden, destekleniyorsa SHA-NI ile yapar)
+    return hmac.compare_digest(mac.digest(), expected_signature)
 
-    # HMAC hesapla
-    mac = hmac.new(webhook_secret.encode(), msg=payload_body, digestmod=hashlib.sha256)
-    calculated_signature = mac.hexdigest()
 
-    # Timing attack'a karşı secure comparison
-    return hmac.compare_digest(calculated_signature, expected_signature)
+def _parse_signature(signature_header: str) -> Optional[bytes]:
+    """
+    sha256=<64 hex> biçimindeki header'ı 32 byte'lık ham digest'e çevir
+
+    Biçimi bozuk header'lar (yanlış prefix, uzunluk ya da hex olmayan karakter)
+    için None döner. Uzunluğa göre erken çıkış sadece geçersiz biçimde olur;
+    doğru uzunluktaki her signature constant-time karşılaştırmaya gider.
+    """
+    # Signature formatı: sha256=<hash>
+    if len(signature_header) != _SIGNATURE_LENGTH or not signature_header.startswith(
+        "sha256="
+    ):
+        return None
+
+    # Hex string yerine 32 byte'lık ham digest'ler karşılaştırılır
+    try:
+        return bytes.fromhex(signature_header[7:])
+    except ValueError:
+        return None
+
+
+def _is_blank(text: Optional[str]) -> bool:
+    """
+    Metin boş ya da sadece whitespace mi?
+
+    str.isspace() C seviyesinde ilk whitespace olmayan karakterde durur ve
+    .strip() gibi diff'in kopyasını oluşturmaz.
+    """
+    return not text or text.isspace()
 
 
 class DiffRequest(BaseModel):
@@ -75,12 +194,54 @@ class GitHubReviewRequest(BaseModel):
     repo: str
     pr_number: int
     review_types: Optional[List[str]] = ["short_summary", "bug_detection"]
+    # True ise dosya bazlı sorunlar tek LLM çağrısıyla bulunup inline comment olarak da gönderilir
+    inline_comments: bool = False
+    # Inline comment'lerin bağlanacağı commit; verilmezse PR'den alınır
+    head_sha: Optional[str] = None
+
+
+# Webhook payload'undan sadece kullanılan alanlar decode edilir;
+# geri kalan onlarca KB'lık PR metadata'sı için dict oluşturulmaz
+class _WebhookOwner(msgspec.Struct):
+    login: Optional[str] = None
+
+
+class _WebhookRepository(msgspec.Struct):
+    name: Optional[str] = None
+    owner: _WebhookOwner = msgspec.field(default_factory=_WebhookOwner)
+
+
+class _WebhookHead(msgspec.Struct):
+    sha: Optional[str] = None
+
+
+class _WebhookPullRequest(msgspec.Struct):
+    number: Optional[int] = None
+    head: _WebhookHead = msgspec.field(default_factory=_WebhookHead)
+
+
+class PullRequestWebhook(msgspec.Struct):
+    """GitHub pull_request webhook payload'u (kullanılan alanlar)"""
+
+    action: Optional[str] = None
+    pull_request: Optional[_WebhookPullRequest] = None
+    repository: _WebhookRepository = msgspec.field(default_factory=_WebhookRepository)
+
+
+_decode_webhook = msgspec.json.Decoder(PullRequestWebhook).decode
+
+
+# Health check body'si sabit; load balancer'ın her poll'unda serialize edilmez
+_HEALTH_RESPONSE = Response(
+    content=orjson.dumps({"status": "ok", "version": app.version}),
+    media_type="application/json",
+)
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "ok", "version": "0.2.0"}
+    return _HEALTH_RESPONSE
 
 
 @app.get("/stats")
@@ -94,92 +255,152 @@ async def get_stats():
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Review cache hit/miss metrics"""
+    return {"review_cache": review_cache_stats()}
+
+
 @app.post("/local-review", response_model=ReviewResponse)
 async def local_review(request: DiffRequest):
     """Local diff'i analiz et (manuel)"""
 
-    if not request.diff_text or len(request.diff_text.strip()) == 0:
+    if _is_blank(request.diff_text):
         raise HTTPException(status_code=400, detail="diff_text boş olamaz")
 
     original_size = len(request.diff_text)
-    diff_to_analyze = truncate_diff(request.diff_text, max_length=3000)
-    was_truncated = len(diff_to_analyze) < original_size
 
-    valid_types = ["short_summary", "bug_detection", "performance", "security"]
-    review_types = request.review_types or ["short_summary", "bug_detection"]
+    review_types = request.review_types or _DEFAULT_REVIEW_TYPES
 
-    for rt in review_types:
-        if rt not in valid_types:
-            raise HTTPException(status_code=400, detail=f"Geçersiz review_type: {rt}")
+    # Tüm geçersiz tipleri tek seferde bul ve birlikte raporla
+    invalid = set(review_types) - _VALID_TYPES
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Geçersiz review_type: {', '.join(sorted(invalid))}",
+        )
 
     try:
-        result = review_diff(diff_text=diff_to_analyze, review_types=review_types)
+        # Tüm review tipleri için LLM çağrıları event loop üzerinde paralel yapılır
+        # Diff review içinde kırpılır; trivial-diff kontrolü tam diff'i görmeli
+        result = await review_diff_async(
+            diff_text=request.diff_text, review_types=review_types, max_length=3000
+        )
 
         # Track parse success
         success = result["status"] == "success"
         ParseStatistics.record_attempt(success)
 
     except Exception as e:
-        logger.error(f"Review error: {str(e)}")
+        logger.error("Review error: %s", e)
         raise HTTPException(status_code=500, detail=f"Review hatası: {str(e)}")
 
     return ReviewResponse(
         status=result["status"],
         file_name=request.file_name,
         diff_length=original_size,
-        was_truncated=was_truncated,
+        was_truncated=result["metadata"]["was_truncated"],
         analyses=result["analyses"],
         metadata=result.get("metadata"),
     )
 
 
 @app.post("/github-review")
-async def github_review(request: GitHubReviewRequest):
+async def github_review(
+    request: GitHubReviewRequest,
+    github_client: GitHubClient = Depends(get_github_client),
+):
     """
     GitHub PR'den diff al, analiz et, sonuçları PR'ye comment olarak gönder
     """
 
     try:
-        # GitHub Client'ı initialize et
-        github_client = GitHubClient()
-
-        # PR'den diff'i al
+        # PR'den diff'i ve değişen dosyaları paralel al
         logger.info(
-            f"📥 PR'den diff alınıyor: {request.owner}/{request.repo}#{request.pr_number}"
+            "📥 PR'den diff alınıyor: %s/%s#%d",
+            request.owner,
+            request.repo,
+            request.pr_number,
         )
-        diff_text = github_client.get_pr_diff(
-            owner=request.owner, repo=request.repo, pr_number=request.pr_number
+        (diff_text, diff_was_cut), files = await asyncio.gather(
+            # Analizde en fazla max_length karakter kullanılıyor, fazlasını indirme
+            github_client.get_pr_diff_capped(
+                owner=request.owner,
+                repo=request.repo,
+                pr_number=request.pr_number,
+                max_bytes=2 * TokenManager.get_max_diff_length(),
+            ),
+            github_client.get_pr_files(
+                owner=request.owner, repo=request.repo, pr_number=request.pr_number
+            ),
         )
 
-        if not diff_text or len(diff_text.strip()) == 0:
+        if _is_blank(diff_text):
             raise HTTPException(status_code=400, detail="PR diff'i boş")
 
-        # Diff'i kırp
+        # İndirme sınırda kesildiyse diff_size PR'nin gerçek diff'i değil
+        # indirilen kısmın boyutudur; diff_truncated bunu belirtir
         original_size = len(diff_text)
-        diff_to_analyze = truncate_diff(diff_text)
-        was_truncated = len(diff_to_analyze) < original_size
-
-        # Review yap (two-stage)
-        logger.info(f"🔍 Analiz yapılıyor: {request.review_types}")
-        result = review_diff(
-            diff_text=diff_to_analyze,
-            review_types=request.review_types or ["short_summary", "bug_detection"],
+
+        # Review yap (two-stage); diff review içinde bir kez kırpılır.
+        # Inline comment isteniyorsa tüm dosyaların review'u da tek bir
+        # batch LLM çağrısıyla paralel yapılır
+        logger.info("🔍 Analiz yapılıyor: %s", request.review_types)
+        review_task = review_diff_async(
+            diff_text=diff_text,
+            review_types=request.review_types or _DEFAULT_REVIEW_TYPES,
         )
 
+        file_reviews = []
+        if request.inline_comments:
+            result, file_reviews = await asyncio.gather(
+                review_task, asyncio.to_thread(review_files, files)
+            )
+        else:
+            result = await review_task
+
         # Track parse success
         ParseStatistics.record_attempt(result["status"] == "success")
 
+        was_truncated = result["metadata"]["was_truncated"] or diff_was_cut
+
         # Sonuçları PR'e comment olarak gönder
         comment_body = _format_review_comment(result, was_truncated)
 
-        logger.info(f"💬 Comment gönderiliyor PR'ye...")
-        github_client.post_pr_comment(
+        logger.info("💬 Comment gönderiliyor PR'ye...")
+        await github_client.post_pr_comment(
             owner=request.owner,
             repo=request.repo,
             pr_number=request.pr_number,
             body=comment_body,
         )
 
+        inline_posted = 0
+        inline_comments = _build_inline_comments(file_reviews)
+        if inline_comments:
+            commit_id = request.head_sha
+            if not commit_id:
+                pr = await github_client.get_pr(
+                    owner=request.owner, repo=request.repo, pr_number=request.pr_number
+                )
+                commit_id = pr["head"]["sha"]
+
+            logger.info("💬 %d inline comment gönderiliyor...", len(inline_comments))
+            responses = await github_client.post_pr_review_comments(
+                owner=request.owner,
+                repo=request.repo,
+                pr_number=request.pr_number,
+                commit_id=commit_id,
+                comments=inline_comments,
+            )
+
+            # Satır diff'te yoksa GitHub 422 döner; diğer comment'ler etkilenmez
+            for response in responses:
+                if isinstance(response, Exception):
+                    logger.warning("⚠️  Inline comment gönderilemedi: %s", response)
+                else:
+                    inline_posted += 1
+
         return {
             "status": "success",
             "message": f"PR #{request.pr_number} review tamamlandı",
@@ -187,88 +408,158 @@ async def github_review(request: GitHubReviewRequest):
             "repo": request.repo,
             "pr_number": request.pr_number,
             "diff_size": original_size,
+            "diff_truncated": diff_was_cut,
+            "changed_files": len(files),
             "was_truncated": was_truncated,
+            "inline_comments": inline_posted,
             "analyses": result["analyses"],
             "metadata": result.get("metadata"),
         }
 
     except HTTPException:
         raise
+    except RateLimitError as e:
+        logger.warning("⏳ %s", e)
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(0, int(e.reset_at - time.time())))},
+        )
     except Exception as e:
-        logger.error(f"GitHub review error: {str(e)}")
+        logger.error("GitHub review error: %s", e)
         raise HTTPException(status_code=500, detail=f"Review hatası: {str(e)}")
 
 
 def _format_review_comment(result: dict, was_truncated: bool = False) -> str:
     """Format review results as GitHub comment"""
 
-    comment = "## 🤖 PR Code Reviewer - Otomatik Analiz\n\n"
+    # Parçalar listede toplanıp sonda tek seferde birleştirilir (+= her seferinde kopyalar)
+    parts = ["## 🤖 PR Code Reviewer - Otomatik Analiz\n\n"]
 
     # Add truncation warning
     if was_truncated:
-        comment += "⚠️ **Not:** Diff çok büyük olduğu için kısaltıldı. Analiz kısmi olabilir.\n\n"
+        parts.append(
+            "⚠️ **Not:** Diff çok büyük olduğu için kısaltıldı. Analiz kısmi olabilir.\n\n"
+        )
 
     analyses = result.get("analyses", {})
+    append = parts.append
 
     # Short Summary
-    if "short_summary" in analyses:
-        summary = analyses["short_summary"]
-        if isinstance(summary, dict) and "error" not in summary:
-            comment += f"### 📝 Özet\n"
-            comment += f"**Değişiklik:** {summary.get('summary', 'N/A')}\n"
-            comment += f"**Önem:** {summary.get('severity', 'N/A')}\n"
-            comment += f"**Tip:** {summary.get('type', 'N/A')}\n\n"
+    summary = analyses.get("short_summary")
+    if isinstance(summary, dict) and "error" not in summary:
+        append(
+            f"### 📝 Özet\n"
+            f"**Değişiklik:** {summary.get('summary', 'N/A')}\n"
+            f"**Önem:** {summary.get('severity', 'N/A')}\n"
+            f"**Tip:** {summary.get('type', 'N/A')}\n\n"
+        )
 
     # Bug Detection
-    if "bug_detection" in analyses:
-        bugs = analyses["bug_detection"]
-        if isinstance(bugs, dict) and "error" not in bugs:
-            if bugs.get("has_bugs"):
-                comment += f"### 🐛 Bulunan Hatalar\n"
-                for issue in bugs.get("issues", []):
-                    comment += f"\n**📍 {issue.get('file', 'unknown')}:{issue.get('line', '?')}**\n"
-                    comment += f"- **Önem:** {issue.get('severity', 'unknown')}\n"
-                    comment += f"- **Tanım:** {issue.get('description', 'N/A')}\n"
-                    comment += f"- **Öneri:** {issue.get('suggestion', 'N/A')}\n"
-                comment += f"\n**Genel Risk:** {bugs.get('overall_risk', 'low')}\n\n"
-            else:
-                comment += f"### ✅ Hata Bulunmadı\n"
-                comment += f"**Risk Seviyesi:** {bugs.get('overall_risk', 'low')}\n\n"
+    bugs = analyses.get("bug_detection")
+    if isinstance(bugs, dict) and "error" not in bugs:
+        overall_risk = bugs.get("overall_risk", "low")
+        if bugs.get("has_bugs"):
+            append("### 🐛 Bulunan Hatalar\n")
+            for issue in bugs.get("issues", ()):
+                get = issue.get
+                file = get("file", "unknown")
+                line = get("line", "?")
+                severity = get("severity", "unknown")
+                description = get("description", "N/A")
+                suggestion = get("suggestion", "N/A")
+                append(
+                    f"\n**📍 {file}:{line}**\n"
+                    f"- **Önem:** {severity}\n"
+                    f"- **Tanım:** {description}\n"
+                    f"- **Öneri:** {suggestion}\n"
+                )
+            append(f"\n**Genel Risk:** {overall_risk}\n\n")
+        else:
+            append(f"### ✅ Hata Bulunmadı\n**Risk Seviyesi:** {overall_risk}\n\n")
 
     # Security Review
-    if "security" in analyses:
-        security = analyses["security"]
-        if isinstance(security, dict) and "error" not in security:
-            if security.get("has_security_issues"):
-                comment += f"### 🔒 Güvenlik Sorunları\n"
-                for vuln in security.get("vulnerabilities", []):
-                    comment += f"\n**⚠️ {vuln.get('file', 'unknown')}:{vuln.get('line', '?')}**\n"
-                    comment += f"- **Risk:** {vuln.get('risk', 'unknown')}\n"
-                    comment += f"- **Öneri:** {vuln.get('recommendation', 'N/A')}\n"
-                comment += f"\n**Güvenlik Seviyesi:** {security.get('security_level', 'safe')}\n\n"
-            else:
-                comment += f"### 🔒 Güvenlik Kontrol\n"
-                comment += f"**Durum:** {security.get('security_level', 'safe')}\n\n"
+    security = analyses.get("security")
+    if isinstance(security, dict) and "error" not in security:
+        security_level = security.get("security_level", "safe")
+        if security.get("has_security_issues"):
+            append("### 🔒 Güvenlik Sorunları\n")
+            for vuln in security.get("vulnerabilities", ()):
+                get = vuln.get
+                file = get("file", "unknown")
+                line = get("line", "?")
+                risk = get("risk", "unknown")
+                recommendation = get("recommendation", "N/A")
+                append(
+                    f"\n**⚠️ {file}:{line}**\n"
+                    f"- **Risk:** {risk}\n"
+                    f"- **Öneri:** {recommendation}\n"
+                )
+            append(f"\n**Güvenlik Seviyesi:** {security_level}\n\n")
+        else:
+            append(f"### 🔒 Güvenlik Kontrol\n**Durum:** {security_level}\n\n")
 
     # Performance Review
-    if "performance" in analyses:
-        perf = analyses["performance"]
-        if isinstance(perf, dict) and "error" not in perf:
-            suggestions = perf.get("suggestions", [])
-            if suggestions:
-                comment += f"### ⚡ Performance Önerileri\n"
-                for sugg in suggestions:
-                    comment += f"\n**📍 {sugg.get('file', 'unknown')}:{sugg.get('line', '?')}**\n"
-                    comment += f"- **Sorun:** {sugg.get('issue', 'N/A')}\n"
-                    comment += f"- **Öneri:** {sugg.get('recommendation', 'N/A')}\n"
-                comment += f"\n**Optimizasyon Potansiyeli:** {perf.get('optimization_potential', 'low')}\n\n"
+    perf = analyses.get("performance")
+    if isinstance(perf, dict) and "error" not in perf:
+        suggestions = perf.get("suggestions", ())
+        if suggestions:
+            append("### ⚡ Performance Önerileri\n")
+            for sugg in suggestions:
+                get = sugg.get
+                file = get("file", "unknown")
+                line = get("line", "?")
+                issue = get("issue", "N/A")
+                recommendation = get("recommendation", "N/A")
+                append(
+                    f"\n**📍 {file}:{line}**\n"
+                    f"- **Sorun:** {issue}\n"
+                    f"- **Öneri:** {recommendation}\n"
+                )
+            append(
+                f"\n**Optimizasyon Potansiyeli:** {perf.get('optimization_potential', 'low')}\n\n"
+            )
 
     # Add stats footer
-    comment += "\n---\n"
-    comment += f"**📊 Parser Stats:** {ParseStatistics.successful_parses} başarılı / {ParseStatistics.total_attempts} toplam ({ParseStatistics.get_success_rate():.0f}%)\n"
-    comment += "*🤖 Bu yorum otomatik olarak oluşturulmuştur.*"
+    append(
+        "\n---\n"
+        f"**📊 Parser Stats:** {ParseStatistics.successful_parses} başarılı / {ParseStatistics.total_attempts} toplam ({ParseStatistics.get_success_rate():.0f}%)\n"
+        "*🤖 Bu yorum otomatik olarak oluşturulmuştur.*"
+    )
+
+    return "".join(parts)
+
+
+def _build_inline_comments(file_reviews: List[dict]) -> List[dict]:
+    """Batch dosya review sonucunu post_pr_review_comments formatına çevir"""
+
+    comments = []
+    for entry in file_reviews:
+        for issue in entry.get("issues", []):
+            line = issue.get("line")
+            if not isinstance(line, int) or line < 1:
+                continue
+
+            comments.append(
+                {
+                    "path": entry["file"],
+                    "line": line,
+                    "body": (
+                        f"**🤖 {issue.get('severity', 'unknown')}:** "
+                        f"{issue.get('description', 'N/A')}\n\n"
+                        f"**Öneri:** {issue.get('suggestion', 'N/A')}"
+                    ),
+                }
+            )
 
-    return comment
+    return comments
+
+
+def _finish_review(cache_key: Tuple[str, str, str], task: "asyncio.Task") -> None:
+    """Biten review'u in-flight listesinden çıkar, başarılıysa cache'e yaz"""
+    _reviews_in_flight.pop(cache_key, None)
+    if not task.cancelled() and task.exception() is None:
+        _review_cache[cache_key] = task.result()
 
 
 @app.post("/webhook")
@@ -277,66 +568,123 @@ async def github_webhook(request: Request):
     GitHub Webhook'dan gelen PR event'lerini handle et
     """
 
-    try:
-        # Ham body'yi al
-        body = await request.body()
-        signature = request.headers.get("X-Hub-Signature-256", "")
-
-        # Signature doğrula
-        if not verify_github_signature(body, signature):
-            logger.error("❌ Geçersiz webhook signature!")
-            raise HTTPException(status_code=403, detail="Invalid signature")
+    delivery_id = request.headers.get("X-GitHub-Delivery")
 
-        # Payload'u parse et
-        payload = await request.json()
+    try:
+        # Aynı delivery daha önce işlendiyse tekrar review yapma
+        if delivery_id and delivery_id in _seen_deliveries:
+            logger.info("♻️  Tekrarlanan delivery atlandı: %s", delivery_id)
+            return {"status": "duplicate", "delivery_id": delivery_id}
 
         # Event tipini kontrol et
         event_type = request.headers.get("X-GitHub-Event", "")
-        logger.info(f"🔔 Webhook alındı: event={event_type}")
+        logger.info("🔔 Webhook alındı: event=%s", event_type)
 
-        # Sadece pull_request event'leri işle
+        # Sadece pull_request event'leri işle. Diğerleri (push, check_run, star...)
+        # hiçbir şey tetiklemediği için body okunmadan, HMAC ve JSON parse yapılmadan döner
         if event_type != "pull_request":
             return {
                 "status": "ignored",
                 "reason": f"Event '{event_type}' desteklenmiyor",
             }
 
-        action = payload.get("action")
-        pr = payload.get("pull_request")
+        # Biçimi bozuk signature'lar (bot/scanner trafiği) body okunmadan
+        # ve HMAC hesaplanmadan reddedilir
+        signature = request.headers.get("X-Hub-Signature-256", "")
+        if not signature or (
+            _HMAC_TEMPLATE is not None and _parse_signature(signature) is None
+        ):
+            logger.error("❌ Geçersiz webhook signature!")
+            raise HTTPException(status_code=403, detail="Invalid signature")
+
+        # Body chunk'lar halinde gelirken HMAC aynı geçişte hesaplanır
+        mac = _HMAC_TEMPLATE.copy() if _HMAC_TEMPLATE is not None else None
+        body = bytearray()
+        async for chunk in request.stream():
+            if mac is not None:
+                mac.update(chunk)
+            body.extend(chunk)
+
+        # Signature doğrula
+        if not _signature_matches(mac, signature):
+            logger.error("❌ Geçersiz webhook signature!")
+            raise HTTPException(status_code=403, detail="Invalid signature")
+
+        # Sadece imzası doğrulanmış delivery'ler kaydedilir
+        if delivery_id:
+            _seen_deliveries[delivery_id] = True
+
+        # Payload'u parse et (request.json() body'yi tekrar işlerdi)
+        payload = _decode_webhook(body)
+
+        action = payload.action
+        pr = payload.pull_request
 
         if not pr:
             return {"status": "ignored", "reason": "PR data yok"}
 
         # Sadece "opened" ve "synchronize" event'leri işle
-        if action not in ["opened", "synchronize"]:
+        if action not in _TRIGGER_ACTIONS:
             return {
                 "status": "ignored",
                 "reason": f"Action '{action}' review tetiklemez",
             }
 
         # Repository bilgilerini al
-        repo_data = payload.get("repository", {})
-        owner = repo_data.get("owner", {}).get("login")
-        repo = repo_data.get("name")
-        pr_number = pr.get("number")
+        owner = payload.repository.owner.login
+        repo = payload.repository.name
+        pr_number = pr.number
+        head_sha = pr.head.sha
 
         if not all([owner, repo, pr_number]):
             raise ValueError("PR metadata eksik")
 
-        logger.info(f"🔔 Webhook: {owner}/{repo}#{pr_number} event={action}")
+        logger.info("🔔 Webhook: %s/%s#%d event=%s", owner, repo, pr_number, action)
 
-        # Review'u tetikle
+        # Review isteği
         review_request = GitHubReviewRequest(
             owner=owner,
             repo=repo,
             pr_number=pr_number,
             review_types=["short_summary", "bug_detection", "security"],
+            head_sha=head_sha,
         )
 
-        return await github_review(review_request)
+        if not head_sha:
+            return await github_review(
+                review_request, github_client=get_github_client(request)
+            )
+
+        # Bu commit zaten review edildiyse önceki sonucu döndür
+        cache_key = (owner, repo, head_sha)
+        cached_result = _review_cache.get(cache_key)
+        if cached_result is not None:
+            logger.info("♻️  Cache hit: %s/%s@%.7s", owner, repo, head_sha)
+            return cached_result
+
+        # Aynı commit'in review'u sürüyorsa onu bekle, yoksa başlat
+        task = _reviews_in_flight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(
+                github_review(review_request, github_client=get_github_client(request))
+            )
+            _reviews_in_flight[cache_key] = task
+            task.add_done_callback(lambda done: _finish_review(cache_key, done))
+        else:
+            logger.info(
+                "⏳ Review sürüyor, bekleniyor: %s/%s@%.7s", owner, repo, head_sha
+            )
+
+        # shield: bekleyen isteklerden biri iptal olsa da review diğerleri için sürer
+        return await asyncio.shield(task)
 
     except HTTPException:
+        # Başarısız delivery'nin GitHub tarafından retry edilebilmesi için kaydı sil
+        if delivery_id:
+            _seen_deliveries.pop(delivery_id, None)
         raise
     except Exception as e:
-        logger.error(f"❌ Webhook hatası: {str(e)}")
+        if delivery_id:
+            _seen_deliveries.pop(delivery_id, None)
+        logger.error("❌ Webhook hatası: %s", e)
         return {"status": "error", "message": str(e)}
@@ -1,10 +1,10 @@
+
+# Statik kısım (rol, kurallar, şema, örnekler) başta, diff en sonda: tüm
+# çağrılar aynı prefix ile başladığı için provider tarafı prompt caching devreye girer
 SHORT_SUMMARY = """You are a code review expert. Analyze this code diff ONLY.
 
 Return ONLY a valid JSON object, NOTHING else. No explanation, no markdown, no text before or after.
 
-Diff:
-{diff_text}
-
 CRITICAL RULES:
 1. Return ONLY JSON
 2. No markdown code blocks
@@ -22,15 +22,15 @@ Return exactly this JSON structure:
 Example valid response:
 {{"summary": "Added None check", "severity": "medium", "type": "bugfix"}}
 
+Diff:
+{diff_text}
+
 Now analyze and return ONLY JSON:"""
 
 BUG_DETECTION = """You are a security and code quality expert. Find potential bugs in this code diff.
 
 Return ONLY a valid JSON object, NOTHING else. No explanation, no markdown.
 
-Diff:
-{diff_text}
-
 CRITICAL RULES:
 1. Return ONLY JSON
 2. No markdown code blocks (no ```json)
@@ -59,15 +59,15 @@ Example with bugs:
 Example without bugs:
 {{"issues": [], "has_bugs": false, "overall_risk": "low"}}
 
+Diff:
+{diff_text}
+
 Now analyze and return ONLY JSON:"""
 
 PERFORMANCE_REVIEW = """You are a performance optimization expert. Review this code diff for performance issues.
 
 Return ONLY a valid JSON object, NOTHING else.
 
-Diff:
-{diff_text}
-
 CRITICAL RULES:
 1. Return ONLY JSON
 2. No markdown, no explanations
@@ -90,15 +90,15 @@ Return exactly this structure:
 Example:
 {{"suggestions": [{{"file": "utils.py", "line": 10, "issue": "O(n²) nested loop", "recommendation": "Use set instead"}}], "optimization_potential": "high"}}
 
+Diff:
+{diff_text}
+
 Now analyze and return ONLY JSON:"""
 
 SECURITY_REVIEW = """You are a security expert. Check this code diff for security vulnerabilities.
 
 Return ONLY a valid JSON object, NOTHING else.
 
-Diff:
-{diff_text}
-
 CRITICAL RULES:
 1. Return ONLY JSON
 2. No markdown, no explanations
@@ -123,6 +123,76 @@ Return exactly this structure:
 Example:
 {{"vulnerabilities": [{{"file": "db.py", "line": 8, "risk": "high", "type": "SQL injection", "recommendation": "Use parameterized queries"}}], "has_security_issues": true, "security_level": "high"}}
 
+Diff:
+{diff_text}
+
+Now analyze and return ONLY JSON:"""
+
+FILE_REVIEW = """You are a code review expert. Review the following file diffs in ONE pass.
+
+Return ONLY a valid JSON object, NOTHING else. No explanation, no markdown.
+
+CRITICAL RULES:
+1. Return ONLY JSON
+2. No markdown code blocks
+3. One entry per file that has issues; skip files without issues
+4. "line" must be a line number in the NEW version of the file that appears in its diff
+5. Keep descriptions SHORT
+
+Return exactly this structure:
+{{
+    "files": [
+        {{
+            "file": "path/to/file.py",
+            "issues": [
+                {{
+                    "line": 10,
+                    "severity": "high|medium|low",
+                    "description": "brief issue description",
+                    "suggestion": "how to fix"
+                }}
+            ]
+        }}
+    ]
+}}
+
+Example without issues:
+{{"files": []}}
+
+Files ({file_count}):
+{files_text}
+
+Now analyze and return ONLY JSON:"""
+
+BATCH_SUMMARY = """You are a code review expert. Summarize EACH of the following independent code diffs.
+
+Return ONLY a valid JSON object, NOTHING else. No explanation, no markdown.
+
+CRITICAL RULES:
+1. Return ONLY JSON
+2. No markdown code blocks
+3. Exactly one entry per diff, with the diff's index
+4. Analyze each diff on its own, do not mix them
+5. Valid JSON syntax required
+
+Return exactly this structure:
+{{
+    "summaries": [
+        {{
+            "index": 0,
+            "summary": "one sentence describing the change",
+            "severity": "low|medium|high",
+            "type": "feature|bugfix|refactor|docs"
+        }}
+    ]
+}}
+
+Example valid response:
+{{"summaries": [{{"index": 0, "summary": "Added None check", "severity": "medium", "type": "bugfix"}}, {{"index": 1, "summary": "Updated README", "severity": "low", "type": "docs"}}]}}
+
+Diffs ({diff_count}):
+{diffs_text}
+
 Now analyze and return ONLY JSON:"""
 
 # ============= PROMPT CONFIG =============
@@ -152,23 +222,75 @@ PROMPT_CONFIG = {
         "temperature": 0.2,
         "fields_needed": ["diff_text"],
     },
+    "FILE_REVIEW": {
+        "description": "Batched per-file review (inline comments)",
+        "max_tokens": 1500,
+        "temperature": 0.2,
+        "fields_needed": ["file_count", "files_text"],
+    },
+    "BATCH_SUMMARY": {
+        "description": "Short summaries of several diffs in one call",
+        "max_tokens": 150,  # Diff başına; çağrıda diff sayısıyla çarpılır
+        "temperature": 0.2,
+        "fields_needed": ["diff_count", "diffs_text"],
+    },
+}
+
+
+# Prompt adı -> template (if/elif zinciri yerine tek dict lookup)
+_TEMPLATES = {
+    "SHORT_SUMMARY": SHORT_SUMMARY,
+    "BUG_DETECTION": BUG_DETECTION,
+    "PERFORMANCE_REVIEW": PERFORMANCE_REVIEW,
+    "SECURITY_REVIEW": SECURITY_REVIEW,
+    "FILE_REVIEW": FILE_REVIEW,
+    "BATCH_SUMMARY": BATCH_SUMMARY,
 }
 
 
 def get_prompt(prompt_name: str, **kwargs) -> str:
     """Get prompt template and fill variables"""
-    if prompt_name == "SHORT_SUMMARY":
-        template = SHORT_SUMMARY
-    elif prompt_name == "BUG_DETECTION":
-        template = BUG_DETECTION
-    elif prompt_name == "PERFORMANCE_REVIEW":
-        template = PERFORMANCE_REVIEW
-    elif prompt_name == "SECURITY_REVIEW":
-        template = SECURITY_REVIEW
-    else:
+    try:
+        template = _TEMPLATES[prompt_name]
+    except KeyError:
         raise ValueError(f"Unknown prompt: {prompt_name}")
 
-    return template.format(**kwargs)
+    # format_map kwargs dict'ini tekrar kopyalamaz
+    return template.format_map(kwargs)
+
+
+# Sadece {diff_text} alan template'ler açılışta bir kez format'lanıp
+# (prefix, suffix) olarak saklanır; çağrı başına format parser'ı çalışmaz
+_DIFF_MARKER = "\x00"
+
+
+def _split_template(template: str) -> tuple:
+    """Format once with a marker and split around it ({{ }} escapes resolved)"""
+    prefix, suffix = template.format(diff_text=_DIFF_MARKER).split(_DIFF_MARKER)
+    return prefix, suffix
+
+
+_PARTS = {
+    name: _split_template(template)
+    for name, template in _TEMPLATES.items()
+    if PROMPT_CONFIG[name]["fields_needed"] == ["diff_text"]
+}
+
+
+def get_diff_prompt(prompt_name: str, diff_text: str) -> str:
+    """
+    get_prompt for the single-diff prompts
+
+    A plain concatenation of the pre-split template parts. Not memoized:
+    repeated reviews are served by the review cache before a prompt is
+    built, and a memo would keep whole diffs alive.
+    """
+    parts = _PARTS.get(prompt_name)
+    if parts is None:
+        return get_prompt(prompt_name, diff_text=diff_text)
+
+    prefix, suffix = parts
+    return prefix + diff_text + suffix
 
 
 def get_prompt_config(prompt_name: str) -> dict:
@@ -6,20 +6,38 @@ Enhanced PR Reviewer with:
 4. Improved LLM error handling
 """
 
-import json
+import asyncio
+import copy
 import logging
-from typing import Dict, Any, Optional, List
-from app.prompts import get_prompt, get_prompt_config
-from app.json_parser import JSONParser
-from dotenv import load_dotenv
-import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Any, Iterator, NamedTuple, Optional, List, Tuple
+import orjson
+from app.prompts import get_diff_prompt, get_prompt, get_prompt_config
+from app.json_parser import FALLBACK_KEY, JSONParser
+from app.config import settings
+from app.llm_cache import LLMCache
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+try:
+    import tiktoken
+except ImportError:  # Optional: falls back to the chars-per-token estimate
+    tiktoken = None
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# The SDK creates one client per service on first use and keeps it, so every
+# call (and the shared _MODEL) reuses the same long-lived channel. transport=None
+# lets the SDK pick grpc for the sync client and grpc_asyncio for the async one.
+genai.configure(
+    api_key=settings.gemini_api_key, transport=settings.gemini_transport
+)
+
+# Handlers are configured once by the application (app/main.py)
 logger = logging.getLogger(__name__)
 
 
@@ -43,44 +61,95 @@ class TokenManager:
 
     @classmethod
     def estimate_tokens(cls, text: str) -> int:
-        """Rough token estimation"""
-        return max(1, int(len(text) * cls.TOKENS_PER_CHAR))
+        """
+        Token count from a real tokenizer when available
+
+        Uses tiktoken's cl100k_base (close enough to Gemini for sizing) once
+        load_tokenizer() has run; falls back to the ~4 chars/token estimate.
+        """
+        return _count_tokens(text)
+
+    @classmethod
+    def get_max_diff_tokens(cls) -> int:
+        """Token budget left for the diff after prompt and safety buffer"""
+        return cls.MAX_INPUT_TOKENS - cls.RESERVED_FOR_PROMPT - cls.BUFFER_TOKENS
 
     @classmethod
     def get_max_diff_length(cls) -> int:
         """Calculate max diff length based on model limits"""
-        available = cls.MAX_INPUT_TOKENS - cls.RESERVED_FOR_PROMPT - cls.BUFFER_TOKENS
-        max_chars = int(available / cls.TOKENS_PER_CHAR)
+        max_chars = int(cls.get_max_diff_tokens() / cls.TOKENS_PER_CHAR)
         return max_chars
 
     @classmethod
     def should_truncate(cls, diff_text: str) -> bool:
         """Check if diff should be truncated"""
         token_count = cls.estimate_tokens(diff_text)
-        return token_count > cls.get_max_diff_length()
+        return token_count > cls.get_max_diff_tokens()
+
+
+# Set by load_tokenizer(); until then (or without tiktoken) tokens are estimated
+_encoding = None
+
+
+def load_tokenizer() -> bool:
+    """
+    Load the tiktoken encoding; True when token counts are exact
+
+    The first load downloads the encoding file (blocking, no timeout), so the
+    app calls this once at startup in a worker thread. Token counting never
+    triggers the load itself and uses the estimate until it has finished.
+    """
+    global _encoding
+
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning("⚠️  Tokenizer unavailable, estimating tokens: %s", e)
+
+    return _encoding is not None
+
+
+def _count_tokens(text: str) -> int:
+    """Token count from the loaded tokenizer, else the chars-per-token estimate"""
+    encoding = _encoding
+
+    if encoding is None:
+        return max(1, int(len(text) * TokenManager.TOKENS_PER_CHAR))
+
+    return max(1, len(encoding.encode(text, disallowed_special=())))
+
+
+# "+++"/"---" file headers are covered by "+"/"-"; "@@" marks hunks
+_DIFF_LINE_PREFIXES = ("+", "-", "@@")
+
+
+def _iter_lines(text: str) -> Iterator[str]:
+    """Yield the same lines as text.split("\\n") without building the list"""
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
 
 
 def extract_diff_summary(diff_text: str, max_lines: int = 30) -> str:
     """Extract important lines from diff (+ and - lines only)"""
 
-    lines = diff_text.split("\n")
-    important_lines = []
-
-    for line in lines:
-        # Keep file headers and change markers
-        if line.startswith("+++") or line.startswith("---"):
-            important_lines.append(line)
-        elif line.startswith("@@"):
-            important_lines.append(line)
-        elif line.startswith("+") or line.startswith("-"):
-            important_lines.append(line)
+    # Keep file headers and change markers, one C-level prefix check per line
+    important_lines = (
+        line for line in _iter_lines(diff_text) if line.startswith(_DIFF_LINE_PREFIXES)
+    )
 
-    # Take first max_lines
-    important = important_lines[:max_lines]
+    # Take first max_lines; scanning stops there instead of splitting the whole diff
+    important = islice(important_lines, max_lines)
     return "\n".join(important)
 
 
-def truncate_diff(diff_text: str, max_length: int = None) -> str:
+def truncate_diff(diff_text: str, max_length: int = None) -> Tuple[str, bool]:
     """
     Intelligently truncate diff while preserving important information
 
@@ -89,37 +158,241 @@ def truncate_diff(diff_text: str, max_length: int = None) -> str:
         max_length: Maximum length (uses TokenManager if None)
 
     Returns:
-        Truncated diff
+        (truncated diff, was_truncated)
     """
 
+    # Default budget is in tokens: a diff that fits is sent whole even if it
+    # is longer than the char estimate allows
     if max_length is None:
         max_length = TokenManager.get_max_diff_length()
+        fits = not TokenManager.should_truncate(diff_text)
+    else:
+        fits = len(diff_text) <= max_length
 
     # Already short enough
-    if len(diff_text) <= max_length:
-        logger.info(f"✅ Diff size OK: {len(diff_text)} chars")
-        return diff_text
+    size = len(diff_text)
+    if fits:
+        logger.info("✅ Diff size OK: %d chars", size)
+        return diff_text, False
 
-    logger.warning(f"⚠️  Diff too long ({len(diff_text)} chars), truncating...")
+    logger.warning("⚠️  Diff too long (%d chars), truncating...", size)
 
     # Try to extract important lines first
     summary = extract_diff_summary(diff_text, max_lines=20)
 
     if len(summary) <= max_length:
-        logger.info(f"✅ Summary fits: {len(summary)} chars")
-        return summary
+        logger.info("✅ Summary fits: %d chars", len(summary))
+        return summary, True
 
     # Still too long - cut from the end
-    logger.warning(f"⚠️  Summary still too long ({len(summary)} chars), cutting...")
+    logger.warning("⚠️  Summary still too long (%d chars), cutting...", len(summary))
     truncated = (
         summary[: max_length - 50] + "\n[... Diff truncated due to size limits ...]"
     )
 
-    return truncated
+    return truncated, True
 
 
 # ============= LLM CALLING WITH ERROR HANDLING =============
 
+# Built once; constructing a GenerativeModel per call redoes client setup
+_MODEL = genai.GenerativeModel("gemini-2.0-flash")
+
+
+class RateLimiter:
+    """
+    Token bucket shared by the sync and async LLM paths
+
+    reserve() never blocks: it takes a token (possibly going into debt)
+    and returns how long the caller must wait, so threads can time.sleep
+    and coroutines can asyncio.sleep on the same bucket.
+    """
+
+    def __init__(self, rate: int, per: float = 60.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token; return seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            refill = (now - self._updated) * self.rate / self.per
+            self._tokens = min(self.rate, self._tokens + refill) - 1
+            self._updated = now
+
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens * self.per / self.rate
+
+
+_llm_limiter = RateLimiter(settings.llm_requests_per_minute)
+
+# Quota (429) and transient unavailability are retried; anything else fails fast
+_RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+)
+LLM_MAX_ATTEMPTS = 4
+_RETRY_INITIAL_DELAY = 0.5
+_RETRY_MAX_DELAY = 8.0
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given 0-based attempt"""
+    return random.uniform(0, min(_RETRY_MAX_DELAY, _RETRY_INITIAL_DELAY * 2**attempt))
+
+
+@lru_cache(maxsize=None)
+def _generation_config(
+    max_tokens: int, temperature: float = 0.2
+) -> genai.types.GenerationConfig:
+    """
+    GenerationConfig per (max_tokens, temperature), built once and reused
+
+    Lower temperature gives more deterministic responses.
+    """
+    return genai.types.GenerationConfig(
+        max_output_tokens=max_tokens, temperature=temperature
+    )
+
+
+# Canned responses served instead of Gemini when LLM_MOCK is set (tests, offline runs)
+_MOCK_RESPONSES = {
+    "SHORT_SUMMARY": '{"summary": "Mock summary of the change", "severity": "low", "type": "refactor"}',
+    "BUG_DETECTION": '{"issues": [], "has_bugs": false, "overall_risk": "low"}',
+    "PERFORMANCE_REVIEW": '{"suggestions": [], "optimization_potential": "low"}',
+    "SECURITY_REVIEW": '{"vulnerabilities": [], "has_security_issues": false, "security_level": "safe"}',
+    "FILE_REVIEW": '{"files": []}',
+}
+
+# "=== DIFF n ===" section headers written by _batch_summary_prompt
+_BATCH_SECTION = re.compile(r"^=== DIFF (\d+) ===$", re.MULTILINE)
+
+
+def _mock_response(prompt_name: str, prompt: str) -> str:
+    """Canned LLM_MOCK answer; BATCH_SUMMARY gets one entry per diff section"""
+    if prompt_name != "BATCH_SUMMARY":
+        return _MOCK_RESPONSES[prompt_name]
+
+    summaries = [
+        {
+            "index": int(index),
+            "summary": f"Mock batch summary of diff {index}",
+            "severity": "low",
+            "type": "refactor",
+        }
+        for index in _BATCH_SECTION.findall(prompt)
+    ]
+    return orjson.dumps({"summaries": summaries}).decode()
+
+
+def _chunk_text(chunk) -> str:
+    """Text of a streamed chunk ("" for chunks without text, e.g. the final one)"""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+class _StreamBuffer:
+    """
+    Streamed response text plus an incremental scan for the first JSON object
+
+    Same brace-depth / string-literal rules as JSONParser._find_json_object,
+    but the scan state is kept between chunks so every character is looked
+    at once instead of rescanning the whole buffer per chunk.
+    """
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> bool:
+        """Append a chunk; True once the first top-level object has closed"""
+        self.parts.append(text)
+
+        i = 0
+        if not self._started:
+            i = text.find("{")
+            if i == -1:
+                return False
+            self._started = True
+
+        depth = self._depth
+        in_string = self._in_string
+        escape = self._escape
+
+        for ch in islice(text, i, None):
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return True
+
+        self._depth = depth
+        self._in_string = in_string
+        self._escape = escape
+        return False
+
+    def text(self) -> str:
+        """Full response text; an empty response is an error, not an answer"""
+        text = "".join(self.parts).strip()
+        if not text:
+            raise ValueError("Empty LLM response")
+        return text
+
+
+def _read_stream(chunks) -> str:
+    """Concatenate streamed chunks, stopping once the JSON object has closed"""
+    buffer = _StreamBuffer()
+    for chunk in chunks:
+        if buffer.feed(_chunk_text(chunk)):
+            break
+
+    return buffer.text()
+
+
+async def _aread_stream(chunks) -> str:
+    """Async variant of _read_stream"""
+    buffer = _StreamBuffer()
+    async for chunk in chunks:
+        if buffer.feed(_chunk_text(chunk)):
+            break
+
+    return buffer.text()
+
+
+def _retry_wait(attempt: int, prompt_name: str, error: Exception) -> float:
+    """Backoff before the next attempt of a throttled call; re-raises on the last"""
+    if attempt == LLM_MAX_ATTEMPTS - 1:
+        raise error
+
+    delay = _retry_delay(attempt)
+    logger.warning("⏳ %s throttled (%s), retrying in %.1fs", prompt_name, error, delay)
+    return delay
+
+
+def _llm_failure(prompt_name: str, error: Exception) -> Exception:
+    """Log a failed LLM call and wrap the error for the caller"""
+    logger.error("❌ LLM call failed: %s", error)
+    return Exception(f"LLM call failed for {prompt_name}: {str(error)}")
+
 
 def call_llm(
     prompt: str, prompt_name: str = "SHORT_SUMMARY", max_tokens: int = 500
@@ -127,6 +400,12 @@ def call_llm(
     """
     Call Gemini API with error handling
 
+    Calls share one rate limiter; quota and unavailable errors are retried
+    with jittered exponential backoff before giving up.
+
+    The response is streamed and reading stops as soon as a complete JSON
+    object has arrived, so trailing text the model adds is never waited for.
+
     Args:
         prompt: Full prompt text
         prompt_name: Prompt name (for logging)
@@ -138,28 +417,65 @@ def call_llm(
     Raises:
         Exception: If API call fails
     """
+    logger.info("📤 LLM call: %s", prompt_name)
+
+    if settings.llm_mock:
+        return _mock_response(prompt_name, prompt)
 
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            time.sleep(_llm_limiter.reserve())
+            try:
+                response = _MODEL.generate_content(
+                    prompt,
+                    generation_config=_generation_config(max_tokens),
+                    stream=True,
+                )
+                response_text = _read_stream(response)
+                break
+            except _RETRYABLE_ERRORS as e:
+                time.sleep(_retry_wait(attempt, prompt_name, e))
 
-        logger.info(f"📤 LLM call: {prompt_name}")
+    except Exception as e:
+        raise _llm_failure(prompt_name, e)
 
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=max_tokens,
-                temperature=0.2,  # Lower temperature for more deterministic responses
-            ),
-        )
+    logger.info("📥 Response received (%d chars)", len(response_text))
+    return response_text
 
-        response_text = response.text.strip()
-        logger.info(f"📥 Response received ({len(response_text)} chars)")
 
-        return response_text
+async def acall_llm(
+    prompt: str, prompt_name: str = "SHORT_SUMMARY", max_tokens: int = 500
+) -> str:
+    """
+    Async variant of call_llm (same arguments, return value and errors)
+
+    Awaits the Gemini SDK's async client so several prompts can be in flight
+    at once on the event loop.
+    """
+    logger.info("📤 LLM call: %s", prompt_name)
+
+    if settings.llm_mock:
+        return _mock_response(prompt_name, prompt)
+
+    try:
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            await asyncio.sleep(_llm_limiter.reserve())
+            try:
+                response = await _MODEL.generate_content_async(
+                    prompt,
+                    generation_config=_generation_config(max_tokens),
+                    stream=True,
+                )
+                response_text = await _aread_stream(response)
+                break
+            except _RETRYABLE_ERRORS as e:
+                await asyncio.sleep(_retry_wait(attempt, prompt_name, e))
 
     except Exception as e:
-        logger.error(f"❌ LLM call failed: {str(e)}")
-        raise Exception(f"LLM call failed for {prompt_name}: {str(e)}")
+        raise _llm_failure(prompt_name, e)
+
+    logger.info("📥 Response received (%d chars)", len(response_text))
+    return response_text
 
 
 def parse_llm_response(
@@ -180,20 +496,70 @@ def parse_llm_response(
         result = JSONParser.parse(response_text, expected_type)
 
         if result:
-            logger.info(f"✅ Parse successful: {expected_type}")
+            logger.info("✅ Parse successful: %s", expected_type)
             return result
         else:
-            logger.error(f"❌ Parse failed for {expected_type}")
+            logger.error("❌ Parse failed for %s", expected_type)
             return None
 
     except Exception as e:
-        logger.error(f"❌ Parse exception: {str(e)}")
+        logger.error("❌ Parse exception: %s", e)
         return None
 
 
 # ============= TWO-STAGE ANALYSIS =============
 
 
+STAGE2_PROMPTS = {
+    "bug_detection": "BUG_DETECTION",
+    "performance": "PERFORMANCE_REVIEW",
+    "security": "SECURITY_REVIEW",
+}
+
+
+def _stage1_prompt(diff_text: str) -> Tuple[str, str, int]:
+    """Build the stage 1 prompt: (prompt_name, prompt, max_tokens)"""
+    # Truncate for quick analysis
+    short_diff, _ = truncate_diff(diff_text, max_length=1000)
+
+    prompt_name = "SHORT_SUMMARY"
+    prompt = get_diff_prompt(prompt_name, short_diff)
+    config = get_prompt_config(prompt_name)
+
+    return prompt_name, prompt, config["max_tokens"]
+
+
+def _stage2_prompt(diff_text: str, review_type: str) -> Tuple[str, str, int]:
+    """
+    Build the stage 2 prompt for one review type: (prompt_name, prompt, max_tokens)
+
+    diff_text is the diff review_diff already truncated to the model
+    budget; it is used as is.
+    """
+    prompt_name = STAGE2_PROMPTS[review_type]
+    prompt = get_diff_prompt(prompt_name, diff_text)
+    config = get_prompt_config(prompt_name)
+
+    return prompt_name, prompt, config["max_tokens"]
+
+
+def _stage2_result(response: str, review_type: str) -> Dict[str, Any]:
+    """Parse a stage 2 response, falling back to the empty template"""
+    result = parse_llm_response(response, review_type)
+
+    if result:
+        return result
+
+    # Fallback response
+    return JSONParser._strategy_fallback_template(review_type)
+
+
+def _stage2_failure(review_type: str, error: Exception) -> Dict[str, Any]:
+    """Failed-analysis dict for a stage 2 review type whose LLM call failed"""
+    logger.error("Stage 2 (%s) failed: %s", review_type, error)
+    return {"error": str(error), "status": "failed"}
+
+
 def analyze_diff_stage1(diff_text: str) -> Optional[Dict[str, Any]]:
     """
     Stage 1: Quick summary analysis (fast, low tokens)
@@ -203,96 +569,458 @@ def analyze_diff_stage1(diff_text: str) -> Optional[Dict[str, Any]]:
     """
 
     try:
-        # Truncate for quick analysis
-        short_diff = truncate_diff(diff_text, max_length=1000)
-
-        prompt_name = "SHORT_SUMMARY"
-        prompt = get_prompt(prompt_name, diff_text=short_diff)
-        config = get_prompt_config(prompt_name)
+        prompt_name, prompt, max_tokens = _stage1_prompt(diff_text)
 
-        response = call_llm(prompt, prompt_name, config["max_tokens"])
+        response = call_llm(prompt, prompt_name, max_tokens)
         result = parse_llm_response(response, "short_summary")
 
         return result
 
     except Exception as e:
-        logger.error(f"Stage 1 failed: {str(e)}")
+        logger.error("Stage 1 failed: %s", e)
         return None
 
 
+def _analyze_stage2_type(diff_text: str, review_type: str) -> Dict[str, Any]:
+    """Run one stage 2 review type; errors become a failed-analysis dict"""
+    try:
+        prompt_name, prompt, max_tokens = _stage2_prompt(diff_text, review_type)
+
+        response = call_llm(prompt, prompt_name, max_tokens)
+        return _stage2_result(response, review_type)
+
+    except Exception as e:
+        return _stage2_failure(review_type, e)
+
+
 def analyze_diff_stage2(diff_text: str, review_types: List[str]) -> Dict[str, Any]:
     """
     Stage 2: Detailed analysis (can use more tokens)
 
+    Review types are independent, blocking LLM calls, so they run on a
+    thread pool: latency is the slowest call instead of the sum.
+
     Returns:
         {bug_detection, security, performance, etc}
     """
 
-    results = {}
+    types = [rt for rt in review_types if rt in STAGE2_PROMPTS]
+    if not types:
+        return {}
 
-    prompt_mapping = {
-        "bug_detection": "BUG_DETECTION",
-        "performance": "PERFORMANCE_REVIEW",
-        "security": "SECURITY_REVIEW",
-    }
+    with ThreadPoolExecutor(max_workers=len(types)) as pool:
+        outputs = pool.map(lambda rt: _analyze_stage2_type(diff_text, rt), types)
+        return dict(zip(types, outputs))
+
+
+async def analyze_diff_stage1_async(diff_text: str) -> Optional[Dict[str, Any]]:
+    """Async variant of analyze_diff_stage1"""
+
+    try:
+        prompt_name, prompt, max_tokens = _stage1_prompt(diff_text)
+
+        response = await acall_llm(prompt, prompt_name, max_tokens)
+        result = parse_llm_response(response, "short_summary")
+
+        return result
+
+    except Exception as e:
+        logger.error("Stage 1 failed: %s", e)
+        return None
 
-    for review_type in review_types:
-        if review_type not in prompt_mapping:
-            continue
 
+async def analyze_diff_stage2_async(
+    diff_text: str, review_types: List[str]
+) -> Dict[str, Any]:
+    """
+    Async variant of analyze_diff_stage2
+
+    The review types are independent prompts, so all LLM calls run
+    concurrently: latency is the slowest call instead of the sum.
+    """
+
+    async def _analyze(review_type: str) -> Dict[str, Any]:
         try:
-            # Use full diff for detailed analysis
-            full_diff = truncate_diff(
-                diff_text, max_length=TokenManager.get_max_diff_length()
-            )
+            prompt_name, prompt, max_tokens = _stage2_prompt(diff_text, review_type)
 
-            prompt_name = prompt_mapping[review_type]
-            prompt = get_prompt(prompt_name, diff_text=full_diff)
-            config = get_prompt_config(prompt_name)
+            response = await acall_llm(prompt, prompt_name, max_tokens)
+            return _stage2_result(response, review_type)
 
-            response = call_llm(prompt, prompt_name, config["max_tokens"])
-            result = parse_llm_response(response, review_type)
+        except Exception as e:
+            return _stage2_failure(review_type, e)
 
-            if result:
-                results[review_type] = result
-            else:
-                # Fallback response
-                results[review_type] = JSONParser._strategy_fallback_template(
-                    review_type
+    types = [rt for rt in review_types if rt in STAGE2_PROMPTS]
+    outputs = await asyncio.gather(*(_analyze(rt) for rt in types))
+
+    return dict(zip(types, outputs))
+
+
+# ============= BATCHED SUMMARIES =============
+
+
+def _batch_summary_prompt(diffs: List[str]) -> Tuple[str, str, int]:
+    """Build one stage 1 prompt covering several diffs: (prompt_name, prompt, max_tokens)"""
+    sections = []
+    for index, diff_text in enumerate(diffs):
+        short_diff, _ = truncate_diff(diff_text, max_length=1000)
+        sections.append(f"=== DIFF {index} ===\n{short_diff}\n")
+
+    prompt_name = "BATCH_SUMMARY"
+    prompt = get_prompt(
+        prompt_name, diff_count=len(diffs), diffs_text="\n".join(sections)
+    )
+    config = get_prompt_config(prompt_name)
+
+    return prompt_name, prompt, config["max_tokens"] * len(diffs)
+
+
+def _split_batch_summary(
+    result: Optional[Dict[str, Any]], count: int
+) -> Dict[int, Dict[str, Any]]:
+    """Map diff index -> {summary, severity, type} from a BATCH_SUMMARY response"""
+    entries = (result or {}).get("summaries")
+    if not isinstance(entries, list):
+        return {}
+
+    summaries = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("index")
+        if isinstance(index, int) and 0 <= index < count and entry.get("summary"):
+            summaries[index] = {
+                "summary": entry["summary"],
+                "severity": entry.get("severity", "unknown"),
+                "type": entry.get("type", "unknown"),
+            }
+
+    return summaries
+
+
+class BatchedSummarizer:
+    """
+    Coalesce concurrent stage 1 summaries into one LLM call
+
+    Requests arriving within `window` seconds of the first one share a
+    single BATCH_SUMMARY prompt, so batch runs over many PRs pay the prompt
+    prefix and the round-trip once per window instead of once per diff.
+    A lone request, and any diff the batch response leaves out, goes
+    through the normal single-diff path.
+    """
+
+    def __init__(self, window: float = 0.05, max_batch: int = 8):
+        """
+        Args:
+            window: Seconds to wait for more diffs after the first one
+            max_batch: Max diffs per LLM call
+        """
+        self.window = window
+        self.max_batch = max_batch
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Keeps in-flight flushes referenced until they finish
+        self._flushes = set()
+
+    async def summarize(self, diff_text: str) -> Optional[Dict[str, Any]]:
+        """Queue a diff for the next window and wait for its summary"""
+        loop = asyncio.get_running_loop()
+
+        # Queues and tasks belong to one event loop
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = None
+
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._collect())
+
+        future = loop.create_future()
+        self._queue.put_nowait((diff_text, future))
+
+        return await future
+
+    async def _collect(self) -> None:
+        """Gather queued diffs into windows and flush each one"""
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.window
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Flush in the background so the next window starts collecting now
+            task = loop.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Summarize one window and hand each result to its waiting caller"""
+        diffs = [diff_text for diff_text, _ in batch]
+        summaries = {}
+
+        if len(batch) > 1:
+            try:
+                prompt_name, prompt, max_tokens = _batch_summary_prompt(diffs)
+
+                response = await acall_llm(prompt, prompt_name, max_tokens)
+                summaries = _split_batch_summary(
+                    parse_llm_response(response, "batch_summary"), len(batch)
                 )
 
-        except Exception as e:
-            logger.error(f"Stage 2 ({review_type}) failed: {str(e)}")
-            results[review_type] = {"error": str(e), "status": "failed"}
+            except Exception as e:
+                logger.error("Batched stage 1 failed: %s", e)
 
-    return results
+        missing = [i for i in range(len(batch)) if i not in summaries]
+        if missing:
+            singles = await asyncio.gather(
+                *(analyze_diff_stage1_async(diffs[i]) for i in missing)
+            )
+            summaries.update(zip(missing, singles))
 
+        for index, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(summaries[index])
+
+
+# Shared by review_diff_async(batch_summary=True) callers
+summary_batcher = BatchedSummarizer()
 
-# ============= MAIN ANALYSIS FUNCTION =============
 
+# ============= BATCHED FILE REVIEW =============
 
-def review_diff(diff_text: str, review_types: List[str] = None) -> Dict[str, Any]:
+
+def review_files(files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    Analyze diff using two-stage approach:
-    1. Quick summary (always)
-    2. Detailed analysis (on demand)
+    Review several changed files with a single LLM call
+
+    One prompt carries every file's patch, so LLM latency is paid once
+    instead of once per file.
 
     Args:
-        diff_text: Code diff text
-        review_types: List of analysis types to perform
-                     ["short_summary", "bug_detection", "performance", "security"]
+        files: GitHub PR files (each with "filename" and "patch")
 
     Returns:
-        Analysis results with metadata
+        [{file, issues: [{line, severity, description, suggestion}]}, ...]
     """
 
-    if review_types is None:
-        review_types = ["short_summary", "bug_detection"]
+    budget = TokenManager.get_max_diff_length()
+    sections = []
+    used = 0
+
+    for f in files:
+        patch = f.get("patch")
+        if not patch:
+            # Binary or too large for GitHub to inline
+            continue
 
-    logger.info(f"🔍 Review starting: {review_types}")
+        section = f"### {f['filename']}\n{patch}\n"
+        if used + len(section) > budget:
+            logger.warning(
+                "⚠️  File review budget reached, %s and later files skipped",
+                f["filename"],
+            )
+            break
 
-    # Prepare diff
-    processed_diff = truncate_diff(diff_text)
+        sections.append(section)
+        used += len(section)
+
+    if not sections:
+        return []
+
+    try:
+        prompt_name = "FILE_REVIEW"
+        prompt = get_prompt(
+            prompt_name, file_count=len(sections), files_text="\n".join(sections)
+        )
+        config = get_prompt_config(prompt_name)
+
+        response = call_llm(prompt, prompt_name, config["max_tokens"])
+        result = parse_llm_response(response, "file_review")
+
+    except Exception as e:
+        logger.error("File review failed: %s", e)
+        return []
+
+    file_reviews = (result or {}).get("files")
+    if not isinstance(file_reviews, list):
+        return []
+
+    return [
+        entry
+        for entry in file_reviews
+        if isinstance(entry, dict) and entry.get("file") and entry.get("issues")
+    ]
+
+
+# ============= RESULT CACHE =============
+
+REVIEW_CACHE_SIZE = 256
+
+# Memory LRU, plus an on-disk layer when LLM_CACHE_DIR is set
+_review_cache = LLMCache(maxsize=REVIEW_CACHE_SIZE, directory=settings.llm_cache_dir)
+
+
+def review_cache_stats() -> Dict[str, Any]:
+    """Review cache hit/miss counters (served on /metrics)"""
+    return _review_cache.stats
+
+
+def _is_cacheable(results: Dict[str, Any]) -> bool:
+    """
+    Only cache complete results so failed LLM calls are retried next time
+
+    Parse failures (empty or cut-off responses answered with the fallback
+    template, listed in metadata.parse_failed) count as failed: caching them
+    would pin the degraded answer for the cache lifetime, on disk for a day.
+    """
+    analyses = results["analyses"]
+    metadata = results["metadata"]
+    stages = metadata["stages_completed"]
+
+    if "short_summary" in analyses and "stage1_summary" not in stages:
+        return False
+    if metadata.get("parse_failed"):
+        return False
+
+    return not any(
+        isinstance(analysis, dict) and "error" in analysis
+        for analysis in analyses.values()
+    )
+
+
+# ============= TRIVIAL DIFFS =============
+
+# Added/removed import statement (content after the +/- marker)
+_NAME = r"[A-Za-z_]\w*"
+_DOTTED = rf"{_NAME}(?:\.{_NAME})*"
+_ALIASED = rf"{_DOTTED}(?:\s+as\s+{_NAME})?"
+# The whole line must be one import statement: "import a.b as c, d" or
+# "from .a import b as c, d". Anything else (";", trailing code, SQL that
+# happens to start with "from") is real code and goes to the LLM.
+_IMPORT_LINE = re.compile(
+    rf"\s*(?:import\s+{_ALIASED}(?:\s*,\s*{_ALIASED})*"
+    rf"|from\s+(?:\.*{_DOTTED}|\.+)\s+import\s+"
+    rf"(?:\*|{_ALIASED}(?:\s*,\s*{_ALIASED})*))\s*$"
+)
+
+# "No issues" answers the prompts themselves ask for, per review type
+_TRIVIAL_ANALYSES = {
+    "bug_detection": {"issues": [], "has_bugs": False, "overall_risk": "low"},
+    "performance": {"suggestions": [], "optimization_potential": "low"},
+    "security": {
+        "vulnerabilities": [],
+        "has_security_issues": False,
+        "security_level": "safe",
+    },
+}
+
+
+def _trivial_diff_summary(diff_text: str) -> Optional[str]:
+    """
+    Summary for diffs that need no LLM review, or None
+
+    Trivial: no changed lines at all (renames, mode changes), only blank
+    lines added/removed, or only import statements added/removed.
+    """
+    changed = 0
+    # "+++ b/x" / "--- a/x" are file headers only before a file's first hunk;
+    # inside a hunk "++count;" or "--- x" are changed lines
+    in_header = True
+
+    for line in _iter_lines(diff_text):
+        if line.startswith("diff --git"):
+            in_header = True
+            continue
+        if line.startswith("@@"):
+            in_header = False
+            continue
+        if in_header and line.startswith(("+++ ", "--- ")):
+            continue
+        if not line.startswith(("+", "-")):
+            continue
+
+        content = line[1:]
+        if not content.strip():
+            continue
+
+        if not _IMPORT_LINE.match(content):
+            return None
+        changed += 1
+
+    return "Imports only" if changed else "No code changes"
+
+
+def _trivial_review(
+    diff_text: str, summary: str, review_types: List[str]
+) -> Dict[str, Any]:
+    """Canonical no-op review, built without any LLM call"""
+    analyses = {}
+
+    for review_type in review_types:
+        if review_type == "short_summary":
+            analyses[review_type] = {
+                "summary": summary,
+                "severity": "low",
+                "type": "refactor",
+            }
+        elif review_type in _TRIVIAL_ANALYSES:
+            # Fresh copy: callers may mutate the result
+            analyses[review_type] = copy.deepcopy(_TRIVIAL_ANALYSES[review_type])
+
+    logger.info("⏭️  Trivial diff (%s), LLM review skipped", summary)
+
+    return {
+        "status": "success",
+        "analyses": analyses,
+        "metadata": {
+            "original_size": len(diff_text),
+            "processed_size": len(diff_text),
+            "was_truncated": False,
+            "stages_completed": [],
+            "skipped": True,
+        },
+    }
+
+
+# ============= MAIN ANALYSIS FUNCTION =============
+
+
+def _get_cached_review(cache_key: str) -> Optional[Dict[str, Any]]:
+    """Return a fresh copy of a cached review, or None"""
+    cached = _review_cache.get(cache_key)
+
+    if cached is not None:
+        logger.info("♻️  Review cache hit")
+
+    return cached
+
+
+def _store_review(cache_key: str, results: Dict[str, Any]) -> None:
+    """Cache a complete review"""
+    if _is_cacheable(results):
+        _review_cache.set(cache_key, results)
+
+
+def _build_results(
+    diff_text: str,
+    processed_diff: str,
+    was_truncated: bool,
+    stage1_result: Optional[Dict[str, Any]],
+    stage2_results: Optional[Dict[str, Any]],
+    run_summary: bool,
+) -> Dict[str, Any]:
+    """Assemble stage outputs into the review result returned to callers"""
 
     results = {
         "status": "success",
@@ -300,16 +1028,13 @@ def review_diff(diff_text: str, review_types: List[str] = None) -> Dict[str, Any
         "metadata": {
             "original_size": len(diff_text),
             "processed_size": len(processed_diff),
-            "was_truncated": len(processed_diff) < len(diff_text),
+            "was_truncated": was_truncated,
             "stages_completed": [],
         },
     }
 
     # Stage 1: Always do summary
-    if "short_summary" in review_types:
-        logger.info("📊 Stage 1: Summary analysis...")
-        stage1_result = analyze_diff_stage1(processed_diff)
-
+    if run_summary:
         if stage1_result:
             results["analyses"]["short_summary"] = stage1_result
             results["metadata"]["stages_completed"].append("stage1_summary")
@@ -322,20 +1047,222 @@ def review_diff(diff_text: str, review_types: List[str] = None) -> Dict[str, Any
             }
 
     # Stage 2: Detailed analysis
-    detail_types = [rt for rt in review_types if rt != "short_summary"]
-
-    if detail_types:
-        logger.info(f"🔬 Stage 2: Detailed analysis ({detail_types})...")
-        stage2_results = analyze_diff_stage2(processed_diff, detail_types)
+    if stage2_results is not None:
         results["analyses"].update(stage2_results)
         results["metadata"]["stages_completed"].append("stage2_detail")
         logger.info("✅ Stage 2 completed")
 
-    logger.info(f"✅ Review complete: {len(results['analyses'])} analyses done")
+    logger.info("✅ Review complete: %d analyses done", len(results["analyses"]))
+
+    return results
+
+
+class _ReviewJob(NamedTuple):
+    """A review that has to go to the LLM, prepared by _prepare_review"""
+
+    cache_key: str
+    run_summary: bool
+    detail_types: List[str]
+
+
+def _prepare_review(
+    diff_text: str, review_types: Optional[List[str]], max_length: Optional[int]
+) -> Tuple[Optional[Dict[str, Any]], Optional[_ReviewJob]]:
+    """
+    Steps before any LLM call, shared by review_diff and review_diff_async
+
+    diff_text must be the full diff: the trivial check on a truncated diff
+    would only see the lines that survived the cut (e.g. the imports at the
+    top) and skip the LLM for code further down.
+
+    Returns:
+        (result, None) when the review is answered without the LLM (trivial
+        diff or cache hit), else (None, job)
+    """
+    if review_types is None:
+        review_types = ["short_summary", "bug_detection"]
+
+    logger.info("🔍 Review starting: %s", review_types)
+
+    # Renames, blank-line and import-only changes: nothing to ask the LLM
+    trivial_summary = _trivial_diff_summary(diff_text)
+    if trivial_summary is not None:
+        return _trivial_review(diff_text, trivial_summary, review_types), None
+
+    # Identical diff + review types: return the stored result, no LLM call
+    cache_key = LLMCache.make_key(diff_text, review_types, max_length)
+    cached = _get_cached_review(cache_key)
+    if cached is not None:
+        return cached, None
+
+    job = _ReviewJob(
+        cache_key=cache_key,
+        run_summary="short_summary" in review_types,
+        detail_types=[rt for rt in review_types if rt != "short_summary"],
+    )
+    return None, job
+
+
+def _complete_review(
+    job: _ReviewJob,
+    diff_text: str,
+    processed_diff: str,
+    was_truncated: bool,
+    stage1_result: Optional[Dict[str, Any]],
+    stage2_results: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Steps after the LLM calls: build the result and cache it if complete"""
+    results = _build_results(
+        diff_text,
+        processed_diff,
+        was_truncated,
+        stage1_result,
+        stage2_results,
+        job.run_summary,
+    )
+
+    # The parser's fallback marker is internal; callers see the failed
+    # review types in metadata instead of an extra key inside the analyses
+    parse_failed = [
+        review_type
+        for review_type, analysis in results["analyses"].items()
+        if isinstance(analysis, dict) and analysis.pop(FALLBACK_KEY, False)
+    ]
+    if parse_failed:
+        results["metadata"]["parse_failed"] = parse_failed
+
+    _store_review(job.cache_key, results)
 
     return results
 
 
+def review_diff(
+    diff_text: str, review_types: List[str] = None, max_length: int = None
+) -> Dict[str, Any]:
+    """
+    Analyze diff using two-stage approach:
+    1. Quick summary (always)
+    2. Detailed analysis (on demand)
+
+    Args:
+        diff_text: Full (untruncated) code diff text
+        review_types: List of analysis types to perform
+                     ["short_summary", "bug_detection", "performance", "security"]
+        max_length: Truncation limit in chars (token budget if None);
+                    metadata.was_truncated reports whether it applied
+
+    Returns:
+        Analysis results with metadata
+    """
+    result, job = _prepare_review(diff_text, review_types, max_length)
+    if job is None:
+        return result
+
+    # Prepare diff
+    processed_diff, was_truncated = truncate_diff(diff_text, max_length)
+
+    stage1_result = None
+    if job.run_summary:
+        logger.info("📊 Stage 1: Summary analysis...")
+        stage1_result = analyze_diff_stage1(processed_diff)
+
+    stage2_results = None
+    if job.detail_types:
+        logger.info("🔬 Stage 2: Detailed analysis (%s)...", job.detail_types)
+        stage2_results = analyze_diff_stage2(processed_diff, job.detail_types)
+
+    return _complete_review(
+        job, diff_text, processed_diff, was_truncated, stage1_result, stage2_results
+    )
+
+
+async def review_diff_async(
+    diff_text: str,
+    review_types: List[str] = None,
+    batch_summary: bool = False,
+    max_length: int = None,
+) -> Dict[str, Any]:
+    """
+    Async variant of review_diff with the same result and cache
+
+    Stage 1 and every stage 2 review type are independent prompts, so all
+    LLM calls are issued concurrently on the event loop.
+
+    Args:
+        batch_summary: Share the stage 1 call with other reviews started
+                       within the same window (batch runs over many PRs)
+    """
+    result, job = _prepare_review(diff_text, review_types, max_length)
+    if job is None:
+        return result
+
+    # Prepare diff. With the tokenizer loaded this encodes the whole diff
+    # (up to a few hundred KB), so it runs off the event loop
+    processed_diff, was_truncated = await asyncio.to_thread(
+        truncate_diff, diff_text, max_length
+    )
+
+    stage1_task = None
+    if job.run_summary:
+        logger.info("📊 Stage 1: Summary analysis...")
+        summarize = (
+            summary_batcher.summarize if batch_summary else analyze_diff_stage1_async
+        )
+        stage1_task = asyncio.create_task(summarize(processed_diff))
+
+    stage2_results = None
+    if job.detail_types:
+        logger.info("🔬 Stage 2: Detailed analysis (%s)...", job.detail_types)
+        stage2_results = await analyze_diff_stage2_async(
+            processed_diff, job.detail_types
+        )
+
+    stage1_result = await stage1_task if stage1_task is not None else None
+
+    return _complete_review(
+        job, diff_text, processed_diff, was_truncated, stage1_result, stage2_results
+    )
+
+
+def review_diff_batch(
+    diffs: List[str], review_types: List[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Review several independent diffs at once (CI / batch runs)
+
+    All reviews run concurrently and their stage 1 summaries share
+    BatchedSummarizer windows, so N diffs need far fewer summary calls.
+
+    Synchronous entry point that runs its own event loop (asyncio.run).
+    Async callers gather review_diff_async(..., batch_summary=True) instead.
+
+    Returns:
+        One review_diff result per diff, in input order
+
+    Raises:
+        RuntimeError: If called while an event loop is running in this thread
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError(
+            "review_diff_batch() cannot run inside an event loop; "
+            "await review_diff_async(..., batch_summary=True) instead"
+        )
+
+    async def _review_all() -> List[Dict[str, Any]]:
+        return await asyncio.gather(
+            *(
+                review_diff_async(diff_text, review_types, batch_summary=True)
+                for diff_text in diffs
+            )
+        )
+
+    return asyncio.run(_review_all())
+
+
 # ============= STATISTICS TRACKING =============
 
 
@@ -346,19 +1273,31 @@ class ParseStatistics:
     successful_parses = 0
     failed_parses = 0
 
+    # Reviews run in worker threads; `+=` on a class attribute is not atomic
+    _lock = threading.Lock()
+
     @classmethod
     def record_attempt(cls, success: bool):
-        cls.total_attempts += 1
-        if success:
-            cls.successful_parses += 1
-        else:
-            cls.failed_parses += 1
+        with cls._lock:
+            cls.total_attempts += 1
+            if success:
+                cls.successful_parses += 1
+            else:
+                cls.failed_parses += 1
+
+    @classmethod
+    def reset(cls):
+        """Zero all counters in one locked step"""
+        with cls._lock:
+            cls.total_attempts = cls.successful_parses = cls.failed_parses = 0
 
     @classmethod
     def get_success_rate(cls) -> float:
-        if cls.total_attempts == 0:
+        with cls._lock:
+            total, successful = cls.total_attempts, cls.successful_parses
+        if total == 0:
             return 0.0
-        return (cls.successful_parses / cls.total_attempts) * 100
+        return (successful / total) * 100
 
     @classmethod
     def print_stats(cls):
@@ -374,6 +1313,9 @@ class ParseStatistics:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    load_tokenizer()
+
     # Test the enhanced reviewer
     test_diff = """--- a/app/main.py
 +++ b/app/main.py
@@ -391,4 +1333,4 @@ if __name__ == "__main__":
 
     print("Testing enhanced reviewer...")
     result = review_diff(test_diff, review_types=["short_summary", "bug_detection"])
-    print(json.dumps(result, indent=2))
+    print(orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
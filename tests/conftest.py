@@ -13,22 +13,92 @@ import os
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-from app.reviewer import ParseStatistics
+# Testler Gemini'ye gitmez; app.config import edilmeden önce set edilmeli
+os.environ.setdefault("LLM_MOCK", "1")
+
+import app.reviewer as reviewer
+from app.reviewer import ParseStatistics, _review_cache, review_diff
 
 
 @pytest.fixture(autouse=True)
 def reset_statistics():
     """Her tests'ten önce statistics'i reset et"""
-    ParseStatistics.total_attempts = 0
-    ParseStatistics.successful_parses = 0
-    ParseStatistics.failed_parses = 0
+    ParseStatistics.reset()
+    _review_cache.clear()
 
     yield
 
     # Cleanup after tests
-    ParseStatistics.total_attempts = 0
-    ParseStatistics.successful_parses = 0
-    ParseStatistics.failed_parses = 0
+    ParseStatistics.reset()
+    _review_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def cached_review():
+    """
+    Aynı (diff, review_types) için review_diff'i session boyunca bir kez çalıştır
+
+    reset_statistics her testte review cache'ini temizlediği için aynı diff'i
+    okuyan testler aksi halde her seferinde LLM'e gider.
+    """
+    results = {}
+
+    def _review(diff_text, review_types=("short_summary",)):
+        key = (diff_text, tuple(review_types))
+        if key not in results:
+            results[key] = review_diff(diff_text, review_types=list(review_types))
+        return results[key]
+
+    return _review
+
+
+@pytest.fixture
+def one_line_diff():
+    """Tek satır değişen, trivial sayılmayan diff"""
+    return "--- a/app.py\n+++ b/app.py\n@@ -1 +1 @@\n-x = 1\n+x = 2\n"
+
+
+class FakeChunk:
+    """Gemini stream chunk'ı (sadece .text)"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """
+    Sırayla responses'taki cevapları stream eden sahte Gemini modeli
+
+    Her cevap ya chunk metinleri listesi ya da fırlatılacak exception'dır.
+    prompts gönderilen prompt'ları, read stream'den okunan chunk'ları tutar.
+    """
+
+    def __init__(self):
+        self.responses = []
+        self.prompts = []
+        self.read = []
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.prompts.append(prompt)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return self.stream(response)
+
+    def stream(self, texts):
+        for text in texts:
+            self.read.append(text)
+            yield FakeChunk(text)
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Mock modu kapatıp _MODEL'i FakeModel ile değiştir (retry beklemesiz)"""
+    model = FakeModel()
+    monkeypatch.setattr(reviewer.settings, "llm_mock", False)
+    monkeypatch.setattr(reviewer, "_MODEL", model)
+    monkeypatch.setattr(reviewer, "_retry_delay", lambda attempt: 0)
+    return model
 
 
 @pytest.fixture
@@ -0,0 +1,33 @@
+"""
+TEST 7: Uygulama Ayarları
+- LOG_LEVEL doğrulaması (geçersiz değer açılışta config hatası verir)
+"""
+
+import pytest
+import sys
+import os
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+from pydantic import ValidationError
+
+from app.config import Settings
+
+
+class TestSettings:
+    """Settings doğrulama testleri"""
+
+    @pytest.mark.parametrize("value", ["debug", "Warning", "ERROR"])
+    def test_log_level_normalized(self, monkeypatch, value):
+        """Test: LOG_LEVEL büyük/küçük harf fark etmeden kabul ediliyor mu?"""
+        monkeypatch.setenv("LOG_LEVEL", value)
+
+        assert Settings(_env_file=None).log_level == value.upper()
+
+    @pytest.mark.parametrize("value", ["verbose", "", "10"])
+    def test_invalid_log_level_rejected(self, monkeypatch, value):
+        """Test: Geçersiz LOG_LEVEL açık bir config hatasıyla reddediliyor mu?"""
+        monkeypatch.setenv("LOG_LEVEL", value)
+
+        with pytest.raises(ValidationError, match="log_level"):
+            Settings(_env_file=None)
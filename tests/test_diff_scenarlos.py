@@ -5,22 +5,21 @@ TEST 3: Different Diff Scenarios
 - Çoklu dosya (3+ dosya)
 """
 
+import asyncio
 import pytest
 import sys
 import os
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
-from app.reviewer import review_diff, TokenManager, truncate_diff
+from app.config import settings
+from app.reviewer import TokenManager, review_diff_batch, truncate_diff
 
 
-class TestDiffScenarios:
-    """Farklı diff senaryoları"""
-
-    @pytest.fixture
-    def small_diff(self):
-        """Scenario 1: Küçük değişiklik (1 dosya, 2 satır)"""
-        return """--- a/utils.py
+@pytest.fixture(scope="module")
+def small_diff():
+    """Scenario 1: Küçük değişiklik (1 dosya, 2 satır)"""
+    return """--- a/utils.py
 +++ b/utils.py
 @@ -1,3 +1,3 @@
  def add(a, b):
@@ -28,33 +27,40 @@ class TestDiffScenarios:
 +    return a + b
 """
 
-    @pytest.fixture
-    def medium_diff(self):
-        """Scenario 2: Orta boy değişiklik (1 dosya, 20 satır)"""
-        diff_lines = ["--- a/app.py\n", "+++ b/app.py\n", "@@ -1,20 +1,25 @@\n"]
-        for i in range(20):
-            diff_lines.append(f" line {i}\n")
-            if i == 10:
-                diff_lines.append("+added line\n")
-        return "".join(diff_lines)
-
-    @pytest.fixture
-    def large_diff(self):
-        """Scenario 3: Büyük diff (1 dosya, 500+ satır)"""
-        diff = """--- a/large_file.py
-+++ b/large_file.py
-@@ -1,500 +1,510 @@
-"""
-        for i in range(500):
-            diff += f" line {i}\n"
-            if i % 50 == 0:
-                diff += f"+added at line {i}\n"
-        return diff
-
-    @pytest.fixture
-    def multi_file_diff(self):
-        """Scenario 4: Çoklu dosya (3 dosya)"""
-        return """--- a/file1.py
+
+@pytest.fixture(scope="module")
+def medium_diff():
+    """Scenario 2: Orta boy değişiklik (1 dosya, 20 satır), modülde bir kez üretilir"""
+    diff_lines = [
+        "--- a/app.py\n",
+        "+++ b/app.py\n",
+        "@@ -1,20 +1,25 @@\n",
+        *(f" line {i}\n" for i in range(20)),
+    ]
+    # Tek eklenen satır " line 10"dan hemen sonra gelir (3 header + 11 satır)
+    diff_lines.insert(14, "+added line\n")
+    return "".join(diff_lines)
+
+
+@pytest.fixture(scope="module")
+def large_diff():
+    """Scenario 3: Büyük diff (1 dosya, 500+ satır), modülde bir kez üretilir"""
+    diff_lines = [
+        "--- a/large_file.py\n",
+        "+++ b/large_file.py\n",
+        "@@ -1,500 +1,510 @@\n",
+    ]
+    for i in range(500):
+        diff_lines.append(f" line {i}\n")
+        if i % 50 == 0:
+            diff_lines.append(f"+added at line {i}\n")
+    return "".join(diff_lines)
+
+
+@pytest.fixture(scope="module")
+def multi_file_diff():
+    """Scenario 4: Çoklu dosya (3 dosya)"""
+    return """--- a/file1.py
 +++ b/file1.py
 @@ -1,3 +1,3 @@
  def func1():
@@ -76,18 +82,22 @@ class TestDiffScenarios:
 +    return None
 """
 
+
+class TestDiffScenarios:
+    """Farklı diff senaryoları"""
+
     # SCENARIO 1: Küçük diff
-    def test_small_diff_success(self, small_diff):
+    def test_small_diff_success(self, cached_review, small_diff):
         """Test: Küçük diff başarıyla işleniyor mu?"""
-        result = review_diff(small_diff, review_types=["short_summary"])
+        result = cached_review(small_diff)
 
         assert result["status"] == "success"
         assert "short_summary" in result["analyses"]
         assert not result["metadata"]["was_truncated"]
 
-    def test_small_diff_fast(self, small_diff):
+    def test_small_diff_fast(self, cached_review, small_diff):
         """Test: Küçük diff tokenları az kullanıyor mu?"""
-        result = review_diff(small_diff, review_types=["short_summary"])
+        result = cached_review(small_diff)
 
         original = result["metadata"]["original_size"]
         processed = result["metadata"]["processed_size"]
@@ -96,17 +106,17 @@ class TestDiffScenarios:
         assert original == processed, "Small diff should not be truncated"
 
     # SCENARIO 2: Orta boy diff
-    def test_medium_diff_success(self, medium_diff):
+    def test_medium_diff_success(self, cached_review, medium_diff):
         """Test: Orta boy diff başarıyla işleniyor mu?"""
-        result = review_diff(medium_diff, review_types=["short_summary"])
+        result = cached_review(medium_diff)
 
         assert result["status"] == "success"
         assert not result["metadata"]["was_truncated"]
 
     # SCENARIO 3: Büyük diff
-    def test_large_diff_handled(self, large_diff):
+    def test_large_diff_handled(self, cached_review, large_diff):
         """Test: Büyük diff truncate ediliyor mu?"""
-        result = review_diff(large_diff, review_types=["short_summary"])
+        result = cached_review(large_diff)
 
         assert result["status"] == "success"
         # Büyük diff'ler truncate olabilir
@@ -116,7 +126,7 @@ class TestDiffScenarios:
 
     def test_large_diff_summary_extraction(self, large_diff):
         """Test: Büyük diff önemli satırları koruyor mu?"""
-        truncated = truncate_diff(large_diff)
+        truncated, _ = truncate_diff(large_diff)
 
         # Önemli markers korunmalı
         assert (
@@ -124,9 +134,9 @@ class TestDiffScenarios:
         ), "Important diff markers should be preserved"
 
     # SCENARIO 4: Çoklu dosya
-    def test_multi_file_diff_success(self, multi_file_diff):
+    def test_multi_file_diff_success(self, cached_review, multi_file_diff):
         """Test: Çoklu dosya diff başarıyla işleniyor mu?"""
-        result = review_diff(multi_file_diff, review_types=["short_summary"])
+        result = cached_review(multi_file_diff)
 
         assert result["status"] == "success"
         assert "short_summary" in result["analyses"]
@@ -141,19 +151,36 @@ class TestDiffScenarios:
     def test_all_scenarios_return_valid_analyses(
         self, small_diff, medium_diff, large_diff, multi_file_diff
     ):
-        """Test: Tüm scenario'lar valid analyses döndürüyor mu?"""
-        scenarios = [
-            ("small", small_diff),
-            ("medium", medium_diff),
-            ("large", large_diff),
-            ("multi", multi_file_diff),
-        ]
+        """Test: Tüm scenario'lar (tek batch'te) valid analyses döndürüyor mu?"""
+        names = ["small", "medium", "large", "multi"]
+        diffs = [small_diff, medium_diff, large_diff, multi_file_diff]
+        results = review_diff_batch(diffs, review_types=["short_summary"])
 
-        for name, diff in scenarios:
-            result = review_diff(diff, review_types=["short_summary"])
+        assert len(results) == len(names)
+        for name, diff, result in zip(names, diffs, results):
 
             assert result["status"] == "success", f"{name} diff failed"
             assert "analyses" in result, f"{name} diff missing analyses"
             assert (
                 "short_summary" in result["analyses"]
             ), f"{name} diff missing short_summary"
+            # Sonuçlar girdi sırasıyla dönmeli
+            assert result["metadata"]["original_size"] == len(diff), f"{name} order"
+
+            summary = result["analyses"]["short_summary"]["summary"]
+            assert isinstance(summary, str) and summary, f"{name} summary empty"
+
+        # Mock cevapta özetlerin tek BATCH_SUMMARY çağrısından geldiği görülür
+        # (gerçek LLM ile, LLM_MOCK=0, metin bilinemez)
+        if settings.llm_mock:
+            summaries = [r["analyses"]["short_summary"]["summary"] for r in results]
+            assert summaries == [f"Mock batch summary of diff {i}" for i in range(4)]
+
+    def test_batch_rejects_running_event_loop(self, small_diff):
+        """Test: review_diff_batch çalışan bir event loop içinden çağrılınca açık hata veriyor mu?"""
+
+        async def call_inside_loop():
+            review_diff_batch([small_diff])
+
+        with pytest.raises(RuntimeError, match="inside an event loop"):
+            asyncio.run(call_inside_loop())
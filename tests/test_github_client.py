@@ -0,0 +1,171 @@
+"""
+TEST 5: GitHub Client
+- X-RateLimit-Remaining düşükken reset zamanına kadar bekleme
+- Reset çok uzaktaysa RateLimitError
+- /github-review'un 503 + Retry-After dönmesi
+- max_bytes sınırında kesilen diff'in işaretlenmesi
+- Comment'lerin JSON olarak gönderilmesi
+"""
+
+import asyncio
+import time
+import pytest
+import sys
+import os
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+import httpx
+import orjson
+from fastapi.testclient import TestClient
+
+import app.github_client as github_client
+import app.main as main
+from app.github_client import MAX_RATE_LIMIT_WAIT, GitHubClient, RateLimitError
+
+
+def _make_client(handler) -> GitHubClient:
+    """İstekleri gerçek API yerine handler'a yönlendiren GitHubClient"""
+    client = GitHubClient(token="test-token")
+    client._client = httpx.AsyncClient(
+        base_url=client.base_url,
+        headers=client.headers,
+        transport=httpx.MockTransport(handler),
+    )
+    return client
+
+
+def _rate_limit_headers(remaining: int, reset_in: float) -> dict:
+    return {
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(time.time() + reset_in),
+    }
+
+
+class TestGitHubRateLimit:
+    """GitHubClient._request rate limit testleri"""
+
+    def test_low_remaining_waits_for_reset(self, monkeypatch):
+        """Test: Kalan kota eşiğin altındayken sonraki istek reset'e kadar bekliyor mu?"""
+        sleeps = []
+        real_sleep = asyncio.sleep
+
+        async def fake_sleep(delay):
+            sleeps.append(delay)
+            await real_sleep(0)
+
+        monkeypatch.setattr(github_client.asyncio, "sleep", fake_sleep)
+
+        def handler(request):
+            return httpx.Response(200, json=[], headers=_rate_limit_headers(2, 30))
+
+        client = _make_client(handler)
+
+        async def run():
+            await client.get_pr_files("owner", "repo", 1)
+            await client.get_pr_files("owner", "repo", 1)
+            await client.aclose()
+
+        asyncio.run(run())
+
+        assert len(sleeps) == 1, "Only the request after the low quota should wait"
+        assert 0 < sleeps[0] <= 30
+
+    def test_reset_beyond_max_wait_raises(self):
+        """Test: Reset MAX_RATE_LIMIT_WAIT'ten uzaksa beklemeden RateLimitError fırlatılıyor mu?"""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(
+                200,
+                json=[],
+                headers=_rate_limit_headers(0, MAX_RATE_LIMIT_WAIT + 60),
+            )
+
+        client = _make_client(handler)
+
+        async def run():
+            await client.get_pr_files("owner", "repo", 1)
+            try:
+                await client.get_pr_files("owner", "repo", 1)
+            finally:
+                await client.aclose()
+
+        with pytest.raises(RateLimitError):
+            asyncio.run(run())
+
+        assert len(requests) == 1, "Second request should not reach the API"
+
+    def test_github_review_returns_503_with_retry_after(self):
+        """Test: Kota dolduğunda /github-review 503 ve Retry-After dönüyor mu?"""
+
+        def handler(request):
+            return httpx.Response(
+                403,
+                json={"message": "API rate limit exceeded"},
+                headers=_rate_limit_headers(0, 120),
+            )
+
+        client = _make_client(handler)
+        main.app.dependency_overrides[main.get_github_client] = lambda: client
+        try:
+            response = TestClient(main.app).post(
+                "/github-review",
+                json={"owner": "owner", "repo": "repo", "pr_number": 1},
+            )
+        finally:
+            main.app.dependency_overrides.pop(main.get_github_client, None)
+
+        assert response.status_code == 503
+        assert 0 < int(response.headers["Retry-After"]) <= 120
+
+
+class TestGitHubDiff:
+    """get_pr_diff_capped testleri"""
+
+    @pytest.mark.parametrize("size,was_cut", [(100, False), (101, True)])
+    def test_cut_diff_is_flagged(self, size, was_cut):
+        """Test: max_bytes'tan uzun diff kesildiğinde işaretleniyor, tam sığan işaretlenmiyor mu?"""
+
+        def handler(request):
+            return httpx.Response(200, content=b"+" * size)
+
+        client = _make_client(handler)
+
+        async def run():
+            try:
+                return await client.get_pr_diff_capped(
+                    "owner", "repo", 1, max_bytes=100
+                )
+            finally:
+                await client.aclose()
+
+        diff_text, cut = asyncio.run(run())
+
+        assert len(diff_text) == min(size, 100)
+        assert cut is was_cut
+
+
+class TestGitHubComments:
+    """Comment POST testleri"""
+
+    def test_comment_posted_as_json(self):
+        """Test: Comment body'si orjson ile JSON olarak ve tek Content-Type ile gönderiliyor mu?"""
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return httpx.Response(201, json={"id": 1})
+
+        client = _make_client(handler)
+
+        async def run():
+            try:
+                return await client.post_pr_comment("owner", "repo", 1, "Merhaba ✅")
+            finally:
+                await client.aclose()
+
+        assert asyncio.run(run()) == {"id": 1}
+        assert sent[0].headers.get_list("Content-Type") == ["application/json"]
+        assert orjson.loads(sent[0].content) == {"body": "Merhaba ✅"}
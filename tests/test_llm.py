@@ -0,0 +1,161 @@
+"""
+TEST 6: LLM Katmanı
+- call_llm: retry, stream okuma, boş cevap
+- BatchedSummarizer: eş zamanlı özetlerin tek çağrıda toplanması
+- LLMCache: disk katmanı
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+from google.api_core.exceptions import ResourceExhausted
+
+import app.reviewer as reviewer
+from app.llm_cache import LLMCache
+
+
+class TestCallLLM:
+    """call_llm retry ve stream okuma testleri"""
+
+    def test_retries_after_rate_limit(self, fake_model):
+        """Test: 429 (ResourceExhausted) sonrası LLM çağrısı tekrar deneniyor mu?"""
+        fake_model.responses = [
+            ResourceExhausted("quota exceeded"),
+            ResourceExhausted("quota exceeded"),
+            ['{"summary": "ok"}'],
+        ]
+
+        assert reviewer.call_llm("prompt") == '{"summary": "ok"}'
+        assert len(fake_model.prompts) == 3
+
+    def test_stream_stops_after_json_object(self, fake_model):
+        """Test: Stream'de JSON objesi kapanınca kalan chunk'lar okunmadan dönüyor mu?"""
+        fake_model.responses = [
+            ['{"issues": [], ', '"has_bugs": false}', "\nExplanation..."]
+        ]
+
+        response = reviewer.call_llm("prompt", "BUG_DETECTION")
+
+        assert response == '{"issues": [], "has_bugs": false}'
+        assert len(fake_model.read) == 2, "Trailing chunk should not be read"
+
+    def test_stream_scan_keeps_string_state_across_chunks(self, fake_model):
+        """Test: Chunk sınırında kalan string/escape durumu korunarak obje sonu bulunuyor mu?"""
+        chunks = fake_model.stream(
+            ['Result: {"a": "x\\', '"}{', '", "b": {"c": 1}}', " tail"]
+        )
+
+        response = reviewer._read_stream(chunks)
+
+        assert response == 'Result: {"a": "x\\"}{", "b": {"c": 1}}'
+        assert len(fake_model.read) == 3, "Scan should stop at the closing chunk"
+
+    @pytest.mark.parametrize("texts", [[], ["", "  \n"]])
+    def test_empty_stream_is_an_error(self, fake_model, texts):
+        """Test: Boş stream başarılı cevap yerine hata olarak dönüyor mu?"""
+        fake_model.responses = [texts]
+
+        with pytest.raises(Exception, match="Empty LLM response"):
+            reviewer.call_llm("prompt", "BUG_DETECTION")
+
+
+async def _review_together(diffs):
+    """Diff'leri aynı anda, stage 1 batching açık review et"""
+    return await asyncio.gather(
+        *(
+            reviewer.review_diff_async(
+                diff, review_types=["short_summary"], batch_summary=True
+            )
+            for diff in diffs
+        )
+    )
+
+
+class TestBatchedSummarizer:
+    """Stage 1 özet batching testleri"""
+
+    @pytest.fixture
+    def diffs(self):
+        """Birbirinden farklı üç küçük diff"""
+        return [
+            f"--- a/app{i}.py\n+++ b/app{i}.py\n@@ -1 +1 @@\n-x = {i}\n+x = {i + 1}\n"
+            for i in range(3)
+        ]
+
+    def test_concurrent_summaries_share_one_llm_call(self, monkeypatch, diffs):
+        """Test: Aynı anda gelen stage 1 özetleri tek LLM çağrısında mı toplanıyor?"""
+        calls = []
+
+        async def fake_acall_llm(prompt, prompt_name="SHORT_SUMMARY", max_tokens=500):
+            calls.append(prompt_name)
+            return (
+                '{"summaries": ['
+                '{"index": 2, "summary": "Third", "severity": "low", "type": "refactor"}, '
+                '{"index": 0, "summary": "First", "severity": "low", "type": "refactor"}, '
+                '{"index": 1, "summary": "Second", "severity": "low", "type": "refactor"}]}'
+            )
+
+        monkeypatch.setattr(reviewer, "acall_llm", fake_acall_llm)
+
+        results = asyncio.run(_review_together(diffs))
+
+        assert calls == ["BATCH_SUMMARY"], "Three diffs should share one LLM call"
+        assert [r["analyses"]["short_summary"]["summary"] for r in results] == [
+            "First",
+            "Second",
+            "Third",
+        ]
+
+    def test_missing_summary_falls_back_to_single_call(self, monkeypatch, diffs):
+        """Test: Batch cevabında eksik kalan diff tek başına özetleniyor mu?"""
+        calls = []
+
+        async def fake_acall_llm(prompt, prompt_name="SHORT_SUMMARY", max_tokens=500):
+            calls.append(prompt_name)
+            if prompt_name == "SHORT_SUMMARY":
+                return '{"summary": "Single", "severity": "low", "type": "refactor"}'
+            return (
+                '{"summaries": ['
+                '{"index": 0, "summary": "First", "severity": "low", "type": "refactor"}, '
+                '{"index": 2, "summary": "Third", "severity": "low", "type": "refactor"}]}'
+            )
+
+        monkeypatch.setattr(reviewer, "acall_llm", fake_acall_llm)
+
+        results = asyncio.run(_review_together(diffs))
+
+        assert calls == ["BATCH_SUMMARY", "SHORT_SUMMARY"]
+        assert [r["analyses"]["short_summary"]["summary"] for r in results] == [
+            "First",
+            "Single",
+            "Third",
+        ]
+
+
+class TestLLMCache:
+    """LLMCache bellek/disk katmanı testleri"""
+
+    def test_disk_cache_survives_restart(self, tmp_path):
+        """Test: Diske yazılan review yeni bir cache instance'ından okunabiliyor mu?"""
+        pytest.importorskip("diskcache")
+
+        key = LLMCache.make_key("diff", ["short_summary"])
+        LLMCache(directory=str(tmp_path)).set(key, {"status": "success"})
+
+        restarted = LLMCache(directory=str(tmp_path))
+
+        assert restarted.get(key) == {"status": "success"}
+        assert restarted.stats["hits"] == 1
+
+    def test_directory_without_diskcache_fails_loudly(self, monkeypatch, tmp_path):
+        """Test: diskcache yokken cache dizini verilirse açılış hata veriyor mu?"""
+        import app.llm_cache as llm_cache
+
+        monkeypatch.setattr(llm_cache, "diskcache", None)
+
+        with pytest.raises(RuntimeError, match="diskcache"):
+            LLMCache(directory=str(tmp_path))
@@ -5,12 +5,15 @@ TEST 1: Local Review Endpoint Test
 - Parse başarısını doğrula
 """
 
+import asyncio
 import pytest
 import sys
 import os
+import threading
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
+import app.reviewer as reviewer
 from app.reviewer import review_diff, truncate_diff
 
 
@@ -95,3 +98,195 @@ class TestLocalReview:
 
         assert original == len(sample_diff), "Original size mismatch"
         assert processed <= original, "Processed size cannot exceed original"
+
+    def test_identical_diff_served_from_cache(self, monkeypatch, one_line_diff):
+        """Test: Aynı diff ikinci kez LLM çağrısı yapmadan cache'ten dönüyor mu?"""
+        calls = []
+
+        def fake_call_llm(prompt, prompt_name="SHORT_SUMMARY", max_tokens=500):
+            calls.append(prompt_name)
+            return '{"summary": "Changed x", "severity": "low", "type": "refactor"}'
+
+        monkeypatch.setattr(reviewer, "call_llm", fake_call_llm)
+
+        first = review_diff(one_line_diff, review_types=["short_summary"])
+        second = review_diff(one_line_diff, review_types=["short_summary"])
+
+        assert second == first
+        assert calls == ["SHORT_SUMMARY"], "Second review should hit the cache"
+
+    @pytest.mark.parametrize("response", ["", '{"summary": "Changed x", "sev'])
+    def test_parse_failure_not_cached(self, monkeypatch, one_line_diff, response):
+        """Test: Boş / yarım LLM cevabı (fallback template) cache'e yazılmıyor mu?"""
+        review_types = ["short_summary", "bug_detection"]
+        calls = []
+
+        def fake_call_llm(prompt, prompt_name="SHORT_SUMMARY", max_tokens=500):
+            calls.append(prompt_name)
+            return response
+
+        monkeypatch.setattr(reviewer, "call_llm", fake_call_llm)
+
+        first = review_diff(one_line_diff, review_types=review_types)
+        review_diff(one_line_diff, review_types=review_types)
+
+        assert first["metadata"]["parse_failed"] == review_types
+        assert all("parse_failed" not in a for a in first["analyses"].values())
+        assert len(calls) == 4, "Parse failure should be retried, not cached"
+
+    def test_file_review_uses_single_llm_call(self, monkeypatch):
+        """Test: Birden fazla dosya tek bir LLM çağrısıyla review ediliyor mu?"""
+        files = [
+            {"filename": "a.py", "patch": "@@ -1 +1 @@\n-x = 1\n+x = 2"},
+            {"filename": "b.py", "patch": "@@ -1 +1 @@\n-y = 1\n+y = None"},
+            {"filename": "logo.png"},
+        ]
+        calls = []
+
+        def fake_call_llm(prompt, prompt_name="SHORT_SUMMARY", max_tokens=500):
+            calls.append(prompt)
+            return (
+                '{"files": [{"file": "b.py", "issues": [{"line": 1, '
+                '"severity": "medium", "description": "y is None", '
+                '"suggestion": "Add a default"}]}, {"file": "a.py", "issues": []}]}'
+            )
+
+        monkeypatch.setattr(reviewer, "call_llm", fake_call_llm)
+
+        result = reviewer.review_files(files)
+
+        assert len(calls) == 1, "All files should share one LLM call"
+        assert "### a.py" in calls[0] and "### b.py" in calls[0]
+        assert "logo.png" not in calls[0], "Files without a patch are skipped"
+        assert [entry["file"] for entry in result] == ["b.py"]
+        assert result[0]["issues"][0]["line"] == 1
+
+    def test_async_review_runs_llm_calls_concurrently(
+        self, monkeypatch, one_line_diff
+    ):
+        """Test: review_diff_async tüm prompt'ları aynı anda mı gönderiyor?"""
+        in_flight = []
+        peak = []
+
+        async def fake_acall_llm(prompt, prompt_name="SHORT_SUMMARY", max_tokens=500):
+            in_flight.append(prompt_name)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.05)
+            in_flight.remove(prompt_name)
+            if prompt_name == "SHORT_SUMMARY":
+                return '{"summary": "Changed x", "severity": "low", "type": "refactor"}'
+            return "not json"
+
+        monkeypatch.setattr(reviewer, "acall_llm", fake_acall_llm)
+
+        result = asyncio.run(
+            reviewer.review_diff_async(
+                one_line_diff,
+                review_types=["short_summary", "bug_detection", "security"],
+            )
+        )
+
+        assert max(peak) == 3, "All three prompts should be in flight together"
+        assert list(result["analyses"]) == ["short_summary", "bug_detection", "security"]
+        assert result["analyses"]["short_summary"]["summary"] == "Changed x"
+        assert result["metadata"]["stages_completed"] == [
+            "stage1_summary",
+            "stage2_detail",
+        ]
+
+
+class TestTrivialDiff:
+    """LLM'e gönderilmeden dönen (trivial) diff testleri"""
+
+    def test_trivial_diff_skips_llm(self, monkeypatch):
+        """Test: Sadece import / boş satır değişen diff LLM'e gitmeden dönüyor mu?"""
+        diff = (
+            "--- a/app.py\n+++ b/app.py\n@@ -1,2 +1,4 @@\n"
+            "+import os\n+from typing import List\n+\n import sys\n"
+        )
+
+        def fake_call_llm(prompt, prompt_name="SHORT_SUMMARY", max_tokens=500):
+            raise AssertionError("Trivial diff should not reach the LLM")
+
+        monkeypatch.setattr(reviewer, "call_llm", fake_call_llm)
+
+        result = review_diff(diff, review_types=["short_summary", "bug_detection"])
+
+        assert result["metadata"]["skipped"] is True
+        assert result["analyses"]["short_summary"]["summary"] == "Imports only"
+        assert result["analyses"]["bug_detection"]["has_bugs"] is False
+
+    @pytest.mark.parametrize(
+        "changed_line",
+        [
+            "+import os; os.system(cmd)",
+            "+from users where 1=1",
+            "+import os  # noqa\n+os.remove(path)",
+            "++count;",
+            "--i;",
+            "+--- end of list",
+        ],
+    )
+    def test_code_changes_are_not_trivial(self, changed_line):
+        """Test: Import'a benzeyen ya da +/- ile başlayan kod satırları LLM'e gidiyor mu?"""
+        diff = f"--- a/app.c\n+++ b/app.c\n@@ -1,1 +1,2 @@\n int i;\n{changed_line}\n"
+
+        assert reviewer._trivial_diff_summary(diff) is None
+
+    def test_second_file_headers_are_skipped(self):
+        """Test: Çok dosyalı diff'te sonraki dosyanın header'ları değişiklik sayılmıyor mu?"""
+        diff = (
+            "diff --git a/a.py b/a.py\n--- a/a.py\n+++ b/a.py\n@@ -1 +1,2 @@\n"
+            "+import os.path as osp\n"
+            "diff --git a/b.py b/b.py\n--- a/b.py\n+++ b/b.py\n@@ -1 +1,2 @@\n"
+            "+from .utils import load, save as store\n"
+        )
+
+        assert reviewer._trivial_diff_summary(diff) == "Imports only"
+
+    def test_imports_before_truncation_cut_still_reviewed(self, monkeypatch):
+        """Test: Kırpılınca sadece import'lar kalan diff yine de LLM'e gidiyor mu?"""
+        diff = (
+            "--- a/app.py\n+++ b/app.py\n@@ -1 +1,140 @@\n"
+            + "".join(f"+import module_{i}\n" for i in range(40))
+            + "+def f(): return eval(input())\n" * 100
+        )
+        truncated, was_truncated = truncate_diff(diff, max_length=3000)
+        assert was_truncated
+        assert reviewer._trivial_diff_summary(truncated) == "Imports only"
+
+        calls = []
+
+        def fake_call_llm(prompt, prompt_name="SHORT_SUMMARY", max_tokens=500):
+            calls.append(prompt_name)
+            return '{"summary": "Adds eval", "severity": "high", "type": "feature"}'
+
+        monkeypatch.setattr(reviewer, "call_llm", fake_call_llm)
+
+        result = review_diff(diff, review_types=["short_summary"], max_length=3000)
+
+        assert calls == ["SHORT_SUMMARY"]
+        assert "skipped" not in result["metadata"]
+        assert result["metadata"]["was_truncated"] is True
+
+    def test_async_review_truncates_once_off_the_event_loop(
+        self, monkeypatch, one_line_diff
+    ):
+        """Test: review_diff_async diff'i bir kez ve event loop thread'i dışında mı kırpıyor?"""
+        threads = []
+        original = reviewer.truncate_diff
+
+        def recording_truncate_diff(diff_text, max_length=None):
+            threads.append(threading.get_ident())
+            return original(diff_text, max_length)
+
+        monkeypatch.setattr(reviewer, "truncate_diff", recording_truncate_diff)
+
+        async def run():
+            await reviewer.review_diff_async(one_line_diff, review_types=["security"])
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(run())
+
+        assert len(threads) == 1, "Diff should be truncated (tokenized) once"
+        assert threads[0] != loop_thread
@@ -0,0 +1,176 @@
+"""
+TEST 4: GitHub Webhook Endpoint
+- X-Hub-Signature-256 doğrulaması (geçerli / yanlış / bozuk / eksik)
+- Desteklenmeyen event'ler body okunmadan dönüyor mu
+- Tekrarlanan / eş zamanlı delivery'ler tek review başlatıyor mu
+"""
+
+import asyncio
+import hashlib
+import hmac
+import pytest
+import sys
+import os
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+import httpx
+import orjson
+from fastapi.testclient import TestClient
+
+import app.main as main
+
+WEBHOOK_SECRET = b"test-secret"
+
+
+def _sign(body: bytes) -> str:
+    """Body için GitHub'ın göndereceği X-Hub-Signature-256 değeri"""
+    return "sha256=" + hmac.new(WEBHOOK_SECRET, body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Secret tanımlı, delivery/review cache'leri boş TestClient"""
+    monkeypatch.setattr(
+        main, "_HMAC_TEMPLATE", hmac.new(WEBHOOK_SECRET, digestmod=hashlib.sha256)
+    )
+    main._seen_deliveries.clear()
+    main._review_cache.clear()
+
+    yield TestClient(main.app)
+
+    main._seen_deliveries.clear()
+    main._review_cache.clear()
+
+
+@pytest.fixture
+def closed_pr_body():
+    """Review tetiklemeyen (action=closed) pull_request payload'u"""
+    return orjson.dumps(
+        {
+            "action": "closed",
+            "pull_request": {"number": 7, "head": {"sha": "abc123"}},
+            "repository": {"name": "repo", "owner": {"login": "owner"}},
+        }
+    )
+
+
+class TestWebhookSignature:
+    """Webhook signature doğrulama testleri"""
+
+    def _post(self, client, body, signature=None, event="pull_request"):
+        headers = {"X-GitHub-Event": event, "Content-Type": "application/json"}
+        if signature is not None:
+            headers["X-Hub-Signature-256"] = signature
+        return client.post("/webhook", content=body, headers=headers)
+
+    def test_valid_signature_accepted(self, client, closed_pr_body):
+        """Test: Doğru imzalı payload kabul edilip parse ediliyor mu?"""
+        response = self._post(client, closed_pr_body, _sign(closed_pr_body))
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "status": "ignored",
+            "reason": "Action 'closed' review tetiklemez",
+        }
+
+    def test_wrong_digest_rejected(self, client, closed_pr_body):
+        """Test: Başka body'nin imzası 403 ile reddediliyor mu?"""
+        response = self._post(client, closed_pr_body, _sign(b"{}"))
+
+        assert response.status_code == 403
+
+    @pytest.mark.parametrize(
+        "signature",
+        [
+            None,
+            "",
+            "sha1=" + "0" * 64,
+            "sha256=" + "z" * 64,
+            "sha256=" + "0" * 63,
+            "sha256=" + "0" * 66,
+        ],
+    )
+    def test_malformed_signature_rejected(self, client, closed_pr_body, signature):
+        """Test: Eksik, yanlış prefix'li, hex olmayan ya da yanlış uzunluktaki imza reddediliyor mu?"""
+        response = self._post(client, closed_pr_body, signature)
+
+        assert response.status_code == 403
+
+    @pytest.mark.parametrize("event", ["push", "check_run", ""])
+    def test_other_events_ignored(self, client, closed_pr_body, event):
+        """Test: pull_request dışındaki event'ler imza kontrolü olmadan yok sayılıyor mu?"""
+        response = self._post(client, closed_pr_body, event=event)
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "ignored"
+
+
+class TestWebhookDelivery:
+    """X-GitHub-Delivery tekrarı testleri"""
+
+    def test_duplicate_delivery_not_reviewed_twice(
+        self, client, monkeypatch, closed_pr_body
+    ):
+        """Test: Aynı delivery id ikinci kez geldiğinde review başlatılmadan duplicate dönüyor mu?"""
+        body = closed_pr_body.replace(b'"closed"', b'"opened"')
+        reviews = []
+
+        async def fake_github_review(review_request, github_client=None):
+            reviews.append(review_request.pr_number)
+            return {"status": "success", "pr_number": review_request.pr_number}
+
+        monkeypatch.setattr(main, "github_review", fake_github_review)
+        monkeypatch.setattr(main, "get_github_client", lambda request: None)
+
+        headers = {
+            "X-GitHub-Event": "pull_request",
+            "X-GitHub-Delivery": "delivery-1",
+            "X-Hub-Signature-256": _sign(body),
+        }
+        first = client.post("/webhook", content=body, headers=headers)
+        second = client.post("/webhook", content=body, headers=headers)
+
+        assert first.json() == {"status": "success", "pr_number": 7}
+        assert second.json() == {"status": "duplicate", "delivery_id": "delivery-1"}
+        assert reviews == [7], "Duplicate delivery should not start a second review"
+
+    def test_concurrent_deliveries_share_one_review(
+        self, client, monkeypatch, closed_pr_body
+    ):
+        """Test: Aynı head SHA için eş zamanlı iki delivery tek review'u paylaşıyor mu?"""
+        body = closed_pr_body.replace(b'"closed"', b'"synchronize"')
+        reviews = []
+
+        async def fake_github_review(review_request, github_client=None):
+            reviews.append(review_request.head_sha)
+            await asyncio.sleep(0.05)
+            return {"status": "success", "head_sha": review_request.head_sha}
+
+        monkeypatch.setattr(main, "github_review", fake_github_review)
+        monkeypatch.setattr(main, "get_github_client", lambda request: None)
+
+        async def post(delivery_id):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as http:
+                return await http.post(
+                    "/webhook",
+                    content=body,
+                    headers={
+                        "X-GitHub-Event": "pull_request",
+                        "X-GitHub-Delivery": delivery_id,
+                        "X-Hub-Signature-256": _sign(body),
+                    },
+                )
+
+        async def run():
+            return await asyncio.gather(post("delivery-a"), post("delivery-b"))
+
+        first, second = asyncio.run(run())
+
+        expected = {"status": "success", "head_sha": "abc123"}
+        assert first.json() == second.json() == expected
+        assert reviews == ["abc123"], "Concurrent deliveries should share one review"
+        assert main._review_cache[("owner", "repo", "abc123")] == first.json()